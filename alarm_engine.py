@@ -0,0 +1,79 @@
+
+# =========================
+# 슬롯 인덱스 빌드
+# =========================
+def build_slot_index(slots, court_group_map, failed=None):
+    """
+    SlotStore → {(court_group, date): {timeContent, ...}}
+    크롤링 1회당 한 번만 만든다.
+
+    failed: 조회 실패한 {(cid, date), ...}
+      → 해당 (그룹, 날짜)는 인덱스에서 빼서 이번 사이클 알람 판단을 건너뛴다
+        (빈 날짜로 보고 슬롯이 닫혔다 다시 열린 것처럼 알람을 울리지 않도록)
+    """
+    index = slots.group_index(court_group_map)
+    for key in failed_group_keys(court_group_map, failed):
+        index.pop(key, None)
+    return index
+
+
+def failed_group_keys(court_group_map, failed):
+    """
+    조회 실패한 {(cid, date), ...} → {(court_group, date), ...}
+    """
+    if not failed:
+        return set()
+
+    cid_to_group = {}
+    for group, cids in court_group_map.items():
+        for cid in cids:
+            cid_to_group[cid] = group
+
+    return {(cid_to_group[cid], date) for cid, date in failed if cid in cid_to_group}
+
+
+# =========================
+# 발송 대상 계산
+# =========================
+def make_slot_key(court_group, date, time_content):
+    return f"{court_group}|{date}|{time_content}"
+
+
+def plan_alerts(candidates, alarms_by_group, sent):
+    """
+    candidates: {(court_group, date): {time: first_seen}} (SlotVersions.recent() 결과)
+    alarms_by_group: {court_group: {date: {subscription_id: armed_version}}}
+    sent: {(subscription_id, slot_key), ...}
+
+    → pending: 알람을 보내야 하는 (sid, group, date, time)
+    알람 등록 뒤(first_seen > armed_version)에 열린 슬롯만, 이미 보낸 것은 제외.
+    """
+    pending = []
+    for (group, date), times in candidates.items():
+        armed = alarms_by_group.get(group, {}).get(date)
+        if not armed:
+            continue
+
+        for subscription_id, armed_version in armed.items():
+            for t in sorted(times):
+                if times[t] <= armed_version:
+                    continue
+                if (subscription_id, make_slot_key(group, date, t)) in sent:
+                    continue
+                pending.append((subscription_id, group, date, t))
+
+    return pending
+
+
+# =========================
+# 구독별 묶음 발송
+# =========================
+def coalesce_pending(pending):
+    """
+    plan_alerts() 의 pending → {subscription_id: {(court_group, date): [time, ...]}}
+    구독 1개당 알림 1건으로 묶는다 (순서는 pending 순서 유지)
+    """
+    grouped = {}
+    for subscription_id, group, date, t in pending:
+        grouped.setdefault(subscription_id, {}).setdefault((group, date), []).append(t)
+    return grouped
@@ -0,0 +1,271 @@
+import json
+import os
+import select
+import threading
+import time
+
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor
+
+from db import connect
+from metrics import METRICS
+from procutil import ProcessThread
+
+# =========================
+# 알람 레지스트리 설정
+# =========================
+# 알람 / 구독 변경을 알리는 NOTIFY 채널
+ALARM_CHANNEL = os.environ.get("ALARM_CHANNEL", "tennis_alarm_changes")
+# 알림이 없을 때 LISTEN 커넥션 생존 확인 주기(초)
+ALARM_LISTEN_TIMEOUT = float(os.environ.get("ALARM_LISTEN_TIMEOUT", "30"))
+# NOTIFY payload 는 8000 bytes 까지 → 넘으면 전체 다시 로드로 대신
+NOTIFY_MAX_BYTES = 7900
+
+REGISTRY_CHANGES = METRICS.counter(
+    "tennis_alarm_registry_changes_total", "LISTEN 으로 반영한 알람/구독 변경 수", ("op",)
+)
+REGISTRY_RELOADS = METRICS.counter(
+    "tennis_alarm_registry_reloads_total", "알람 레지스트리 전체 로드 수", ("reason",)
+)
+
+
+def subscription_info(endpoint, p256dh, auth):
+    # webpush() 에 그대로 넘기는 형태
+    return {"endpoint": endpoint, "keys": {"p256dh": p256dh, "auth": auth}}
+
+
+# =========================
+# 변경 알림 (writer 쪽)
+# =========================
+def notify_change(cur, change):
+    """
+    알람 / 구독을 바꾸는 트랜잭션 안에서 호출
+    → commit 될 때만 모든 워커의 LISTEN 커넥션에 전달된다 (rollback 이면 사라짐)
+
+    change:
+      {"op": "alarm_add", "sid", "group", "date", "armed"}
+      {"op": "alarm_del", "sid", "group", "date"}
+      {"op": "sub_put", "sid", "endpoint", "p256dh", "auth"}
+      {"op": "sub_del", "sids": [...]}     구독 + 그 구독의 알람 전체
+      {"op": "prune", "before": "YYYYMMDD"}  지난 날짜 알람
+      {"op": "reload"}
+    """
+    payload = json.dumps(change, ensure_ascii=False)
+    if len(payload.encode("utf-8")) > NOTIFY_MAX_BYTES:
+        payload = json.dumps({"op": "reload"})
+    cur.execute("SELECT pg_notify(%s, %s)", (ALARM_CHANNEL, payload))
+
+
+# =========================
+# 전체 로드
+# =========================
+def read_alarm_tables(cur):
+    """
+    alarms / push_subscriptions 전체 → (alarm_rows, subs)
+      alarm_rows: [(subscription_id, court_group, date, armed_version), ...]
+      subs: {subscription_id: subscription_info}
+    (RealDictCursor 기준)
+    """
+    cur.execute("""
+        SELECT a.subscription_id, g.name AS court_group, a.date, a.armed_version
+        FROM alarms a
+        JOIN court_groups g ON g.id = a.court_group_id
+    """)
+    alarm_rows = [
+        (r["subscription_id"], r["court_group"], r["date"], r["armed_version"])
+        for r in cur.fetchall()
+    ]
+
+    cur.execute("SELECT id, endpoint, p256dh, auth FROM push_subscriptions")
+    subs = {
+        r["id"]: subscription_info(r["endpoint"], r["p256dh"], r["auth"])
+        for r in cur.fetchall()
+    }
+    return alarm_rows, subs
+
+
+def index_alarms(alarm_rows):
+    """
+    → {court_group: {date: {subscription_id: armed_version}}}
+    """
+    by_group = {}
+    for sid, group, date, armed in alarm_rows:
+        by_group.setdefault(group, {}).setdefault(date, {})[sid] = armed
+    return by_group
+
+
+# =========================
+# 워커별 알람 레지스트리
+# =========================
+class AlarmRegistry:
+    """
+    (코트그룹, 날짜) → 구독 id (+ armed_version) 역인덱스와 구독 키를 메모리에 들고 있는다.
+
+    - 워커마다 LISTEN 전용 커넥션 1개 → 어느 워커에서 바뀌어도 NOTIFY 로 반영
+    - LISTEN 을 (다시) 연결할 때마다 전체 로드 (끊긴 동안 놓친 변경 보정)
+    - LISTEN 중이 아니면 ready=False → 사이클은 DB 에서 직접 읽는다
+    """
+
+    def __init__(self, channel=ALARM_CHANNEL):
+        self.channel = channel
+        self._by_group = {}     # court_group → {date: {sid: armed_version}}
+        self._alarms_of = {}    # sid → {(court_group, date)}
+        self._subs = {}         # sid → subscription_info
+        self._lock = threading.Lock()
+        self._listening = False
+        self._stale = True
+        self._thread = ProcessThread(self._loop, "alarm-registry", before_start=self._reset)
+        self.loaded_at = None
+
+    @property
+    def ready(self):
+        return self._listening and not self._stale
+
+    # -------------------------
+    # 조회 (사이클 시작 시 1번)
+    # -------------------------
+    def snapshot(self):
+        """
+        → (alarms_by_group, subs, alarm_count)
+          alarms_by_group: {court_group: {date: {sid: armed_version}}}
+          subs: {sid: subscription_info} (사이클에서 만료 구독을 빼도 되는 복사본)
+        """
+        with self._lock:
+            alarms_by_group = {
+                group: {d: dict(sids) for d, sids in dates.items()}
+                for group, dates in self._by_group.items()
+            }
+            count = sum(len(keys) for keys in self._alarms_of.values())
+            return alarms_by_group, dict(self._subs), count
+
+    # -------------------------
+    # 갱신
+    # -------------------------
+    def load(self, alarm_rows, subs):
+        by_group = index_alarms(alarm_rows)
+        alarms_of = {}
+        for sid, group, date, _ in alarm_rows:
+            alarms_of.setdefault(sid, set()).add((group, date))
+
+        with self._lock:
+            self._by_group = by_group
+            self._alarms_of = alarms_of
+            self._subs = dict(subs)
+            self._stale = False
+            self.loaded_at = time.time()
+
+    def _add_alarm(self, sid, group, date, armed):
+        self._by_group.setdefault(group, {}).setdefault(date, {})[sid] = armed
+        self._alarms_of.setdefault(sid, set()).add((group, date))
+
+    def _remove_alarm(self, sid, group, date):
+        dates = self._by_group.get(group)
+        if dates is not None:
+            sids = dates.get(date)
+            if sids is not None:
+                sids.pop(sid, None)
+                if not sids:
+                    del dates[date]
+            if not dates:
+                del self._by_group[group]
+
+        keys = self._alarms_of.get(sid)
+        if keys is not None:
+            keys.discard((group, date))
+            if not keys:
+                del self._alarms_of[sid]
+
+    def apply(self, change):
+        """
+        notify_change() 로 보낸 변경 1건 반영 (같은 변경을 두 번 받아도 결과 동일)
+        """
+        op = change.get("op")
+        with self._lock:
+            if op == "alarm_add":
+                self._add_alarm(change["sid"], change["group"], change["date"], change.get("armed", 0))
+            elif op == "alarm_del":
+                self._remove_alarm(change["sid"], change["group"], change["date"])
+            elif op == "sub_put":
+                self._subs[change["sid"]] = subscription_info(
+                    change["endpoint"], change["p256dh"], change["auth"]
+                )
+            elif op == "sub_del":
+                for sid in change["sids"]:
+                    self._subs.pop(sid, None)
+                    for group, date in list(self._alarms_of.get(sid, ())):
+                        self._remove_alarm(sid, group, date)
+            elif op == "prune":
+                before = change["before"]
+                for group, dates in list(self._by_group.items()):
+                    for date, sids in list(dates.items()):
+                        if date < before:
+                            for sid in list(sids):
+                                self._remove_alarm(sid, group, date)
+            else:
+                # reload 또는 모르는 변경 → 전체 다시 로드
+                op = "reload"
+                self._stale = True
+        REGISTRY_CHANGES.inc(op=op)
+
+    # -------------------------
+    # LISTEN (워커마다 스레드 1개)
+    # -------------------------
+    def start(self):
+        self._thread.start()
+
+    def _reset(self):
+        # fork 전 부모의 상태는 LISTEN 이 붙기 전까지 믿지 않는다
+        self._listening = False
+        self._stale = True
+
+    def _loop(self):
+        delay = 1
+        while True:
+            started = time.monotonic()
+            try:
+                self._listen()
+            except Exception as e:
+                print("[WARN] alarm registry listener:", e)
+            finally:
+                self._listening = False
+
+            # 오래 잘 붙어 있다가 끊긴 경우는 바로 재연결
+            if time.monotonic() - started > 60:
+                delay = 1
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+
+    def _listen(self):
+        conn = connect()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+
+            # LISTEN 이후에 로드 → 로드 중에 생긴 변경은 아래에서 이어서 반영된다
+            self._stale = True
+            self._listening = True
+            reason = "connect"
+            while True:
+                if self._stale:
+                    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                        self.load(*read_alarm_tables(cur))
+                    REGISTRY_RELOADS.inc(reason=reason)
+                    print(f"[INFO] alarm registry loaded ({reason}, pid={os.getpid()})")
+                    reason = "notify"
+
+                if select.select([conn], [], [], ALARM_LISTEN_TIMEOUT) == ([], [], []):
+                    # 조용할 때도 커넥션이 살아 있는지 확인
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT 1")
+
+                conn.poll()
+                while conn.notifies:
+                    n = conn.notifies.pop(0)
+                    try:
+                        change = json.loads(n.payload)
+                    except ValueError:
+                        change = {"op": "reload"}
+                    self.apply(change)
+        finally:
+            conn.close()
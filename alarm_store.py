@@ -0,0 +1,131 @@
+from alarm_engine import make_slot_key
+from alarm_registry import notify_change
+from slot_versions import SlotVersions
+
+
+# =========================
+# 발송 기록 일괄 로드
+# =========================
+def load_sent_slots(cur):
+    """
+    활성 알람이 있는 구독의 sent_slots 를 쿼리 1번으로 가져온다.
+    (RealDictCursor 기준)
+
+    → {(subscription_id, slot_key), ...}
+    """
+    cur.execute("""
+        SELECT s.subscription_id, g.name AS court_group, s.date, t.time_content
+        FROM sent_slots s
+        JOIN court_groups g ON g.id = s.court_group_id
+        JOIN slot_times t ON t.id = s.time_id
+        WHERE s.subscription_id IN (SELECT subscription_id FROM alarms)
+    """)
+    return {
+        (r["subscription_id"], make_slot_key(r["court_group"], r["date"].strip(), r["time_content"]))
+        for r in cur.fetchall()
+    }
+
+
+# =========================
+# 전체 슬롯 스냅샷
+# =========================
+def load_slot_versions(cur, cached=None):
+    """
+    slot_meta.version 이 캐시와 같으면 캐시를 그대로, 아니면 slot_snapshot 전체 로드
+    (RealDictCursor 기준)
+    """
+    cur.execute("SELECT version FROM slot_meta WHERE id = 1")
+    row = cur.fetchone()
+    version = row["version"] if row else 0
+
+    if cached is not None and cached.clean and cached.version == version:
+        return cached
+
+    cur.execute("""
+        SELECT g.name AS court_group, s.date, t.time_content, s.first_seen
+        FROM slot_snapshot s
+        JOIN court_groups g ON g.id = s.court_group_id
+        JOIN slot_times t ON t.id = s.time_id
+    """)
+    return SlotVersions.from_rows(version, [
+        (r["court_group"], r["date"].strip(), r["time_content"], r["first_seen"])
+        for r in cur.fetchall()
+    ])
+
+
+def encode_slots(catalog, rows):
+    """
+    rows: [(..., court_group, date, time_content), ...] 의 마지막 3개 열
+    → 열별 배열 (court_group_id[], date[], time_id[])
+    """
+    group_ids = catalog.group_ids_for({r[-3] for r in rows})
+    time_ids = catalog.time_ids_for({r[-1] for r in rows})
+    return (
+        [group_ids[r[-3]] for r in rows],
+        [r[-2] for r in rows],
+        [time_ids[r[-1]] for r in rows],
+    )
+
+
+def save_slot_diff(cur, opened, closed, version, catalog):
+    """
+    opened / closed: SlotVersions.diff() 결과
+    열린 슬롯은 first_seen=version 으로 넣고, 닫힌 슬롯은 지운다.
+    """
+    rows = [(g, d, t) for (g, d), times in closed.items() for t in times]
+    if rows:
+        cur.execute("""
+            DELETE FROM slot_snapshot s
+            USING unnest(%s::int[], %s::text[], %s::smallint[]) AS c(court_group_id, date, time_id)
+            WHERE s.court_group_id = c.court_group_id
+              AND s.date = c.date
+              AND s.time_id = c.time_id
+        """, encode_slots(catalog, rows))
+
+    rows = [(g, d, t) for (g, d), times in opened.items() for t in times]
+    if rows:
+        cur.execute("""
+            INSERT INTO slot_snapshot (court_group_id, date, time_id, first_seen)
+            SELECT c.*, %s FROM unnest(%s::int[], %s::text[], %s::smallint[]) AS c
+            ON CONFLICT (court_group_id, date, time_id)
+            DO UPDATE SET first_seen = EXCLUDED.first_seen
+        """, (version, *encode_slots(catalog, rows)))
+
+
+def save_slot_version(cur, version):
+    cur.execute("UPDATE slot_meta SET version = %s WHERE id = 1", (version,))
+
+
+# =========================
+# 발송 기록 일괄 저장
+# =========================
+def save_sent_slots(cur, rows, catalog):
+    """
+    rows: [(subscription_id, court_group, date, time_content), ...]
+    """
+    if not rows:
+        return
+
+    sids = [r[0] for r in rows]
+    cur.execute("""
+        INSERT INTO sent_slots (subscription_id, court_group_id, date, time_id)
+        SELECT * FROM unnest(%s::text[], %s::int[], %s::text[], %s::smallint[])
+        ON CONFLICT DO NOTHING
+    """, (sids, *encode_slots(catalog, rows)))
+
+
+# =========================
+# 만료 구독 정리
+# =========================
+def delete_subscriptions(cur, subscription_ids):
+    """
+    404/410 으로 만료된 구독과 그 알람/기록을 함께 삭제
+    """
+    sids = list(subscription_ids)
+    if not sids:
+        return
+
+    cur.execute("DELETE FROM alarms WHERE subscription_id = ANY(%s)", (sids,))
+    cur.execute("DELETE FROM sent_slots WHERE subscription_id = ANY(%s)", (sids,))
+    cur.execute("DELETE FROM push_subscriptions WHERE id = ANY(%s)", (sids,))
+    notify_change(cur, {"op": "sub_del", "sids": sids})
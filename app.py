@@ -1,16 +1,30 @@
-from flask import Flask, jsonify, request, send_file, redirect, session, send_from_directory
+from flask import Flask, jsonify, request, send_file, redirect, session, send_from_directory, Response
 from datetime import datetime,timezone,timedelta
 from collections import defaultdict
-import os, json, traceback, requests, re
+from contextlib import closing
+import os, json, requests, re
+from functools import lru_cache
 import threading
 import time
 import queue
-from pywebpush import webpush
 import json
-import psycopg2
 from psycopg2.extras import RealDictCursor
 
-from tennis_core import run_all
+from tennis_core import run_all, stream_all, FACILITIES as STREAM_FACILITIES, AVAILABILITY as STREAM_AVAILABILITY
+from db import get_db
+from alarm_engine import build_slot_index, failed_group_keys, plan_alerts, coalesce_pending, make_slot_key
+from alarm_registry import AlarmRegistry, notify_change, read_alarm_tables, index_alarms
+from catalog import Catalog, SENT_SLOTS_TABLE, SLOT_SNAPSHOT_TABLE, SCHEMA_LOCK_KEY, find_court_group, migrate_catalog
+from alarm_store import (
+    load_sent_slots, load_slot_versions, save_slot_diff, save_slot_version, save_sent_slots, delete_subscriptions
+)
+from push_delivery import PushJob, deliver_all, summarize, make_topic, PERMANENT, PAYLOAD, PUSH_TTL, PUSH_URGENCY
+from push_transport import PushTransport
+from scheduler import CrawlScheduler
+from retention import RetentionWorker
+from metrics import METRICS
+from slot_store import SlotStore
+from snapshot import build_snapshot, serve_snapshot, diff_availability, DeltaLog, SnapshotStore, SnapshotWatcher
 
 
 
@@ -32,11 +46,8 @@ db_initialized = False
 # =========================
 # 데이터베이스 연결
 # =========================
-def get_db():
-    return psycopg2.connect(
-        os.environ["DATABASE_URL"],
-        sslmode="require"
-    )
+# 워커 프로세스별 커넥션 풀 (db.py)
+# with get_db() as conn: → 빌려서 쓰고 commit/rollback 후 반납
 
 # =========================
 # 데이터베이스 초기화
@@ -45,15 +56,42 @@ def init_db():
     print("🔥 init_db CALLED")
     with get_db() as conn:
         with conn.cursor() as cur:
+            # 워커들이 동시에 시작해도 스키마 변경은 한 번에 하나씩
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_KEY,))
+
+            # ✅ 카탈로그 (알람 쪽 테이블은 이름 대신 이 id 를 저장)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS court_groups (
+                    id SERIAL PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE
+                );
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS facilities (
+                    rid TEXT PRIMARY KEY,
+                    court_group_id INT NOT NULL REFERENCES court_groups (id),
+                    title TEXT NOT NULL,
+                    location TEXT,
+                    active BOOLEAN NOT NULL DEFAULT TRUE,
+                    updated_at TIMESTAMP DEFAULT NOW()
+                );
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS slot_times (
+                    id SMALLSERIAL PRIMARY KEY,
+                    time_content TEXT NOT NULL UNIQUE
+                );
+            """)
+
             # alarms 테이블
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS alarms (
                     id SERIAL PRIMARY KEY,
                     subscription_id TEXT NOT NULL,
-                    court_group TEXT NOT NULL,
+                    court_group_id INT NOT NULL REFERENCES court_groups (id),
                     date TEXT NOT NULL,
                     created_at TIMESTAMP DEFAULT NOW(),
-                    UNIQUE (subscription_id, court_group, date)
+                    UNIQUE (subscription_id, court_group_id, date)
                 );
             """)
 
@@ -68,37 +106,44 @@ def init_db():
                 );
             """)
 
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS sent_slots (
-                    subscription_id TEXT NOT NULL,
-                    slot_key TEXT NOT NULL,
-                    sent_at TIMESTAMP DEFAULT NOW(),
-                    PRIMARY KEY (subscription_id, slot_key)
-                );
-            """)
+            cur.execute(SENT_SLOTS_TABLE.format(name="sent_slots"))
 
-            # ✅ baseline_slots 테이블 (이게 핵심)
+            # ✅ 전체 빈자리 스냅샷 (슬롯마다 처음 보인 크롤링 버전)
+            cur.execute(SLOT_SNAPSHOT_TABLE.format(name="slot_snapshot"))
             cur.execute("""
-                CREATE TABLE IF NOT EXISTS baseline_slots (
-                    id SERIAL PRIMARY KEY,
-                    subscription_id TEXT NOT NULL,
-                    court_group TEXT NOT NULL,
-                    date CHAR(8) NOT NULL,
-                    time_content TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    UNIQUE (subscription_id, court_group, date, time_content)
+                CREATE TABLE IF NOT EXISTS slot_meta (
+                    id INT PRIMARY KEY CHECK (id = 1),
+                    version BIGINT NOT NULL DEFAULT 0
                 );
             """)
+            cur.execute("INSERT INTO slot_meta (id, version) VALUES (1, 0) ON CONFLICT DO NOTHING")
+
+            # 알람은 등록 시점의 스냅샷 버전만 기억 (구독별 baseline 복사본 대신)
+            cur.execute("ALTER TABLE alarms ADD COLUMN IF NOT EXISTS armed_version BIGINT NOT NULL DEFAULT 0")
+            cur.execute("DROP TABLE IF EXISTS baseline_slots")
+            # 이름 / TEXT 키로 만든 이전 테이블 → 카탈로그 id
+            migrate_catalog(cur)
+
+            # 보관 기간 정리(retention.py)용 인덱스
+            cur.execute("CREATE INDEX IF NOT EXISTS alarms_date_idx ON alarms (date)")
+            cur.execute("CREATE INDEX IF NOT EXISTS sent_slots_sent_at_idx ON sent_slots (sent_at)")
         conn.commit()
 
+db_init_lock = threading.Lock()
+
 @app.before_request
 def ensure_db_initialized():
     global db_initialized
     if db_initialized:
         return
 
-    init_db()
-    db_initialized = True
+    # 프로세스당 한 번만 (동시 요청이 와도 init_db 1회)
+    with db_init_lock:
+        if db_initialized:
+            return
+        init_db()
+        catalog.load()
+        db_initialized = True
 
 import hashlib
 
@@ -118,14 +163,75 @@ def service_worker():
     return send_from_directory("static", "sw.js")
 
 # =========================
-# 전역 캐시
+# 전역 캐시 (워커 간 공유 파일)
 # =========================
-CACHE = {
+# facilities / slots(SlotStore) / updated_at (내용이 마지막으로 바뀐 시각)
+# version: 내용이 바뀔 때마다 증가 (/data/delta?since=)
+# snapshot: /data 응답 (직렬화 + 압축 + ETag, 크롤링마다 1번)
+# deltas: 버전별 변경분 링 버퍼
+SNAPSHOTS = SnapshotStore()
+
+EMPTY_CACHE = {
     "facilities": {},
-    "availability": {},
-    "updated_at": None
+    "slots": SlotStore(),
+    "updated_at": None,
+    "version": None,
+    "snapshot": build_snapshot({}, SlotStore(), None),
+    "deltas": DeltaLog()
 }
 
+
+def current_cache():
+    return SNAPSHOTS.load() or EMPTY_CACHE
+
+
+def checked_at():
+    ts = SNAPSHOTS.checked_at()
+    return datetime.fromtimestamp(ts, KST).isoformat() if ts else None
+
+
+def with_checked_at(resp):
+    # 마지막 크롤링 시각은 ETag 을 만드는 본문 밖 헤더로 → 304 에도 실린다
+    checked = checked_at()
+    if checked:
+        resp.headers["X-Checked-At"] = checked
+    return resp
+
+
+def next_version(prev):
+    # 재시작 후에도 겹치지 않도록 ms 타임스탬프 기반
+    return max(int(time.time() * 1000), (prev or 0) + 1)
+
+
+def publish_cache(facilities, slots):
+    prev = current_cache()
+    deltas = prev["deltas"].copy()
+    version = prev["version"]
+
+    if version is None or facilities != prev["facilities"] or "slots" not in prev:
+        # 시설 목록이 바뀌면(또는 이전 형식 스냅샷이면) delta 대신 전체 스냅샷
+        version = next_version(version)
+        deltas.reset(version)
+    else:
+        added, removed = diff_availability(prev["slots"], slots)
+        if not (added or removed):
+            # 내용이 그대로면 스냅샷(updated_at / ETag 포함)도 그대로 → 클라이언트는 304
+            # 크롤링 시각만 갱신 (X-Checked-At)
+            SNAPSHOTS.touch()
+            return
+        version = next_version(version)
+        deltas.record(version, added, removed)
+
+    updated_at = datetime.now(KST).isoformat()
+    SNAPSHOTS.publish({
+        "facilities": facilities,
+        "slots": slots,
+        "updated_at": updated_at,
+        "version": version,
+        "snapshot": build_snapshot(facilities, slots, updated_at, version),
+        "deltas": deltas
+    })
+
 # =========================
 # 메인 페이지
 # =========================
@@ -138,213 +244,514 @@ def index():
 # =========================
 @app.route("/data")
 def data():
-    if not CACHE["updated_at"]:
-        try:
-            facilities, raw_availability = crawl_all()
-            availability = {}
-            for cid, days in raw_availability.items():
-                availability[cid] = {}
-                for date, slots in days.items():
-                    availability[cid][date] = []
-                    for s in slots:
-                        availability[cid][date].append({
-                            "timeContent": s.get("timeContent"),
-                            "resveId": s.get("resveId")   # 🔥 이 줄이 핵심
-                        })
-
-            CACHE["facilities"] = facilities
-            CACHE["availability"] = availability
-            CACHE["updated_at"] = datetime.now(KST).isoformat()
-
-        except Exception:
-            pass
-
-    return jsonify({
-        "facilities": CACHE["facilities"],
-        "availability": CACHE["availability"],
-        "updated_at": CACHE["updated_at"]
+    cache = current_cache()
 
-    })
+    # 아직 크롤링 결과가 없으면 여기서 크롤링하지 않고 스케줄러에 맡긴다
+    if not cache["updated_at"]:
+        scheduler.trigger()
+        resp = jsonify({"error": "warming up"})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "30"
+        return resp
+
+    return with_checked_at(serve_snapshot(cache["snapshot"], request))
+
+
+# =========================
+# 변경분 API
+# =========================
+@app.route("/data/delta")
+def data_delta():
+    cache = current_cache()
+    since = request.args.get("since", type=int)
+    changes = cache["deltas"].since(since) if since is not None else None
+
+    # 모르는/너무 오래된 버전 → 전체 스냅샷
+    if changes is None:
+        return data()
+
+    version, added, removed = changes
+    return with_checked_at(jsonify({
+        "mode": "delta",
+        "version": version,
+        "updated_at": cache["updated_at"],
+        "added": added,
+        "removed": removed
+    }))
+
+# =========================
+# 실시간 변경 스트림 (SSE)
+# =========================
+STREAM_HEARTBEAT = float(os.environ.get("STREAM_HEARTBEAT", "20"))
+# 연결 1개가 gthread 스레드 1개를 점유하므로 워커당 동시 연결 수를 제한
+# (넘으면 503 → 페이지는 잠시 후 /data/delta 로 받고 다시 연결을 시도)
+STREAM_MAX = int(os.environ.get("STREAM_MAX", "50"))
+# 연결 1개를 유지하는 최대 시간(초) → 닫으면 EventSource 가 Last-Event-ID 로 재연결
+STREAM_LIFETIME = float(os.environ.get("STREAM_LIFETIME", "300"))
+watcher = SnapshotWatcher(SNAPSHOTS)
+stream_slots = threading.BoundedSemaphore(STREAM_MAX)
+
+
+def sse_event(event, payload, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+@app.route("/stream")
+def stream():
+    if not stream_slots.acquire(blocking=False):
+        resp = jsonify({"error": "too many streams"})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "60"
+        return resp
+
+    watcher.start()
+
+    # 재연결 시 브라우저가 Last-Event-ID 로 마지막 버전을 보내준다
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("since")
+    try:
+        version = int(last_id) if last_id else None
+    except ValueError:
+        version = None
+
+    def events():
+        nonlocal version
+        yield "retry: 5000\n\n"
+
+        if version is None:
+            version = current_cache()["version"]
+            yield sse_event("hello", {"version": version}, version)
+
+        checked = checked_at()
+        if checked:
+            yield sse_event("checked", {"checked_at": checked})
+
+        deadline = time.monotonic() + STREAM_LIFETIME
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+
+            cache = current_cache()
+            if cache["version"] == version:
+                watcher.wait(version, min(STREAM_HEARTBEAT, remaining))
+                if current_cache()["version"] == version:
+                    # 내용은 그대로지만 다시 크롤링됨 → 확인 시각만
+                    latest = checked_at()
+                    if latest != checked:
+                        checked = latest
+                        yield sse_event("checked", {"checked_at": checked})
+                    else:
+                        yield ": ping\n\n"
+                continue
+
+            changes = cache["deltas"].since(version)
+            if changes is None:
+                # 놓친 변경분이 너무 많음 → 클라이언트가 /data 를 다시 받음
+                version = cache["version"]
+                yield sse_event("reset", {"version": version}, version)
+                continue
+
+            version, added, removed = changes
+            checked = checked_at()
+            yield sse_event("delta", {
+                "version": version,
+                "updated_at": cache["updated_at"],
+                "added": added,
+                "removed": removed
+            }, version)
+
+    resp = Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+    # 클라이언트가 끊거나 수명이 끝나 응답이 닫히면 자리 반환
+    resp.call_on_close(stream_slots.release)
+    return resp
 
 # =========================
 # 크롤링 갱신 (UptimeRobot)
 # =========================
 @app.route("/refresh")
 def refresh():
+    options = {}
+    if request.args.get("test") in ("1", "2", "3"):
+        options["test"] = request.args.get("test")
+
+    # ?wait=1 → 이 요청 안에서 끝까지 실행 (수동 점검용)
+    if request.args.get("wait") == "1":
+        summary = scheduler.run_now(options)
+        if summary is None:
+            return jsonify({"triggered": False, **scheduler.status()}), 409
+        return jsonify(summary), (200 if summary["ok"] else 500)
+
+    triggered = scheduler.trigger(options)
+    return jsonify({"triggered": triggered, **scheduler.status()})
+
+
+@app.route("/refresh/status")
+def refresh_status():
+    status = scheduler.status()
+    status["retention"] = retention.last_run()
+    status["alarm_registry"] = {
+        "ready": alarm_registry.ready,
+        "loaded_at": alarm_registry.loaded_at,
+    }
+    return jsonify(status)
+
+
+# =========================
+# 크롤링 사이클 (스케줄러 스레드에서 실행)
+# =========================
+# 1: 시설 조회가 끝나는 대로 코트 그룹 단위로 매칭/발송
+# 0: 전체 크롤링이 끝난 뒤 한 번에
+STREAM_MATCH = os.environ.get("STREAM_MATCH", "1") == "1"
+# 새로 열린 슬롯을 몇 사이클 동안 발송 대상으로 볼지 (일시적 발송 실패 재시도)
+PUSH_RETRY_CYCLES = int(os.environ.get("PUSH_RETRY_CYCLES", "3"))
+
+ALERTS_FIRED = METRICS.counter("tennis_alerts_fired_total", "발송 성공한 빈자리 알림 수")
+FIRST_ALERT_SECONDS = METRICS.histogram(
+    "tennis_first_alert_seconds", "사이클 시작 → 첫 알림 발송까지(초)"
+)
+CYCLE_SIZE = METRICS.gauge(
+    "tennis_cycle_size", "마지막 사이클의 시설 / 슬롯 / 알람 / 구독 수", ("kind",)
+)
+
+
+def run_cycle(options, timer):
     print("[INFO] refresh start")
-    with get_db() as conn:
-        with conn.cursor() as cur:
-            cleanup_old_alarm_data(cur)
-        conn.commit()
-    try:
-        facilities, availability = crawl_all()
-        court_group_map = build_court_group_map(facilities)
-    except Exception as e:
-        print("[ERROR] crawl failed", e)
-        return "crawl failed", 500
+    started = time.perf_counter()
+    # 알람 / 구독은 레지스트리에서, 슬롯 스냅샷 / sent 는 크롤링 전에 한 번 로드
+    with timer.phase("prepare"):
+        ctx = load_alarm_context(started)
+        hot_keys = load_hot_keys(ctx["alarms_by_group"])
+
+    # 🔥 테스트 모드(?test=1|2)는 슬롯 주입 후 한 번에 매칭
+    test = options.get("test")
+    streaming = STREAM_MATCH and test not in ("1", "2")
+
+    with timer.phase("crawl"):
+        if streaming:
+            facilities, availability, failed, complete = crawl_streaming(hot_keys, ctx, timer)
+        else:
+            facilities, availability, failed, complete = crawl_all(hot_keys=hot_keys)
+            ctx["listing_complete"] = complete and bool(facilities)
+        # 스트리밍이면 시설 목록을 받았을 때 이미 만든 맵
+        court_group_map = ctx.get("court_group_map") or build_court_group_map(facilities)
 
-    # 🔥 테스트 모드: ?test=1
-    if request.args.get("test") == "1":
+    if test == "1":
         inject_test_slot_1(facilities, availability)
-    if request.args.get("test") == "2":
+    if test == "2":
         inject_test_slot_2(facilities, availability)
-    if request.args.get("test") == "3":
-        with get_db() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("SELECT * FROM push_subscriptions LIMIT 1")
-                s = cur.fetchone()
-
-        if s:
-            send_push_notification(
-                {
-                    "endpoint": s["endpoint"],
-                    "keys": {
-                        "p256dh": s["p256dh"],
-                        "auth": s["auth"]
-                    }
-                },
-                title="🎾 예약 가능 알림 테스트",
-                body="정상 동작 확인"
-            )
-        else:
-            print("[TEST] push_subscriptions 비어 있음")
-    try:
-        new_availability = {}
-        for cid, days in availability.items():
-            new_availability[cid] = {}
-            for date, slots in days.items():
-                new_availability[cid][date] = []
-                for s in slots:
-                    new_availability[cid][date].append({
-                    "timeContent": s.get("timeContent"),
-                    "resveId": s.get("resveId"),
-                    })
-        CACHE["facilities"] = facilities
-        CACHE["availability"] = new_availability
-        CACHE["updated_at"] = datetime.now(KST).isoformat()
+    if test == "3":
+        send_test_push()
+
+    with timer.phase("cache"):
+        # 크롤링 결과 → 슬롯 배열 (캐시 / /data / 매칭 모두 이것 하나로)
+        slots = SlotStore.from_availability(availability)
+        publish_cache(facilities, slots)
         print("[INFO] CACHE updated in /refresh")
-    except Exception as e:
-        print("[ERROR] cache update failed", e)
-    
-    # ✅ 여기!
-    court_group_map = build_court_group_map(facilities)
-    current_slots = flatten_slots(facilities, availability)
+        # 시설 목록이 바뀌었을 때만 facilities / court_groups 갱신
+        catalog.sync_facilities(facilities, court_group_map, ctx["listing_complete"])
+
+    # 스트리밍에서 안 본 그룹(알람 없는 그룹, 목록에서 사라진 그룹)까지 스냅샷에 반영
+    # (스트리밍이 아니면 여기서 전체를 한 번에 매칭)
+    rest = {g: cids for g, cids in court_group_map.items() if g not in ctx["diffed"]}
+    vanished = ctx["versions"].groups() - set(court_group_map)
+    if ctx["listing_complete"]:
+        for group in vanished:
+            rest[group] = []
+    elif vanished:
+        # 목록 조회 실패(503 등)로 빠진 그룹은 조회 실패처럼 직전 스냅샷 유지
+        print(f"[WARN] facility list incomplete, keeping {len(vanished)} missing groups")
+    dispatch_alarms(ctx, slots, rest, failed, timer)
+    finish_slot_versions(ctx)
+
+    push_stats = summarize(ctx["results"], ctx["push_elapsed"])
+    print(f"[INFO] push batch {push_stats}")
+
+    fired = ctx["fired"]
+    ALERTS_FIRED.inc(fired)
+    if ctx["first_alert_ms"] is not None:
+        FIRST_ALERT_SECONDS.observe(ctx["first_alert_ms"] / 1000)
+    CYCLE_SIZE.set(len(facilities), kind="facilities")
+    CYCLE_SIZE.set(len(slots), kind="slots")
+    CYCLE_SIZE.set(ctx["alarm_count"], kind="alarms")
+    CYCLE_SIZE.set(len(ctx["subs"]), kind="subscriptions")
+
+    print(f"[INFO] refresh done (fired={fired})")
+    return {
+        "facilities": len(facilities),
+        "failed_fetches": len(failed),
+        "alarms": ctx["alarm_count"],
+        "fired": fired,
+        "expired": len(ctx["expired"]),
+        "first_alert_ms": ctx["first_alert_ms"],
+        "streaming": streaming,
+        "push": push_stats,
+    }
 
-    try:
-        with get_db() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("SELECT * FROM alarms")
-                alarms = cur.fetchall()
-
-                cur.execute("SELECT * FROM push_subscriptions")
-                subs = cur.fetchall()
-
-                # ✅ subs_map 정의 (id -> subscription dict)
-                subs_map = {}
-                for s in subs:
-                    subs_map[s["id"]] = {
-                        "endpoint": s["endpoint"],
-                        "keys": {"p256dh": s["p256dh"], "auth": s["auth"]},
-                    }
-
-                fired = 0
-
-                for alarm in alarms:
-                    subscription_id = alarm["subscription_id"]
-                    alarm_group = alarm["court_group"]
-                    alarm_date = alarm["date"]
-
-                    group_cids = court_group_map.get(alarm_group, [])
-                    if not group_cids:
-                        continue
-
-                    # 🔑 이 알람(사람+코트+날짜)의 baseline 로드
-                    cur.execute("""
-                        SELECT time_content
-                        FROM baseline_slots
-                        WHERE subscription_id = %s
-                        AND court_group = %s
-                        AND date = %s
-                    """, (subscription_id, alarm_group, alarm_date))
-
-                    baseline = {r["time_content"] for r in cur.fetchall()}
-
-                    # 🔥 최초 refresh → baseline 초기화만 하고 알람 ❌
-                    if not baseline:
-                        times = {
-                            slot["time"]
-                            for slot in current_slots
-                            if slot["cid"] in group_cids and slot["date"] == alarm_date
-                        }
-                        for t in times:
-                            add_to_baseline(cur, subscription_id, alarm_group, alarm_date, t)
-                        continue
-                            # ❗ 최초 refresh에서는 절대 알람 안 울림
-                    print("DEBUG alarm:", subscription_id, alarm_group, alarm_date)
-                    print("DEBUG group_cids:", group_cids)
-
-                    for slot in current_slots:
-                        if slot["date"] == alarm_date:
-                            print("DEBUG slot:", slot["cid"], slot["date"], slot["time"])
-
-                    # 🔔 이후 refresh → 신규 슬롯만 알람
-                    for slot in current_slots:
-                        if slot["cid"] not in group_cids:
-                            continue
-                        if slot["date"] != alarm_date:
-                            continue
-                        if slot["time"] in baseline:
-                            continue
-
-                        sub = subs_map.get(subscription_id)
-                        if not sub:
-                            continue
-
-                        # 중복 발송 방지 (group 기준)
-                        slot_key = f"{alarm_group}|{alarm_date}|{slot['time']}"
-
-                        cur.execute("""
-                            SELECT 1 FROM sent_slots
-                            WHERE subscription_id=%s AND slot_key=%s
-                        """, (subscription_id, slot_key))
-                        if cur.fetchone():
-                            continue
-
-                        # 🔔 알람 발송
-                        send_push_notification(
-                            sub,
-                            title="🎾 예약 가능 알림",
-                            body=f"{alarm_group} {alarm_date} {slot['time']}"
-                        )
-                        fired += 1
-                        print(f"[INFO] push sent to {subscription_id} | {alarm_group} | {alarm_date} | {slot['time']}")
-
-                        # 기록
-                        add_to_baseline(
-                            cur,
-                            subscription_id,
-                            alarm_group,
-                            alarm_date,
-                            slot["time"]
-                        )
-                        baseline.add(slot["time"])
-
-                        cur.execute("""
-                            INSERT INTO sent_slots (subscription_id, slot_key)
-                            VALUES (%s, %s)
-                            ON CONFLICT DO NOTHING
-                        """, (subscription_id, slot_key))
 
+def load_alarm_context(started):
+    """
+    사이클 동안 그룹별 매칭/발송이 같이 쓰는 상태
+    알람 / 구독은 레지스트리(LISTEN 중일 때) 사본을 쓰고, 아니면 DB 에서 읽는다.
+    """
+    global slot_versions_cache
+    from_registry = alarm_registry.ready
+    if from_registry:
+        alarms_by_group, subs_map, alarm_count = alarm_registry.snapshot()
 
-            conn.commit()
+    with get_db() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            if not from_registry:
+                alarm_rows, subs_map = read_alarm_tables(cur)
+                alarms_by_group = index_alarms(alarm_rows)
+                alarm_count = len(alarm_rows)
+
+            # 🔑 직전 스냅샷(버전이 같으면 메모리 캐시) + 활성 알람의 sent_slots
+            versions = load_slot_versions(cur, slot_versions_cache)
+            sent = load_sent_slots(cur)
+
+    # 사이클 도중 실패하면 캐시를 버리고 다음 사이클에서 DB 에서 다시 로드
+    versions.clean = False
+    slot_versions_cache = versions
+
+    return {
+        "started": started,
+        "alarm_count": alarm_count,
+        "alarms_by_group": alarms_by_group,
+        "subs": subs_map,
+        "versions": versions,
+        "version": versions.version + 1,
+        # 첫 스냅샷은 기존 빈자리라 알람 없이 채우기만
+        "alert": versions.version > 0,
+        "diffed": set(),
+        # 시설 목록을 전부 받았는지 (크롤링에서 채움)
+        "listing_complete": False,
+        # 스냅샷 diff 는 모았다가 사이클 끝에 버전과 함께 한 번에 저장
+        "opened": {},
+        "closed": {},
+        "sent": sent,
+        "results": [],
+        "push_elapsed": 0.0,
+        "fired": 0,
+        "expired": set(),
+        "first_alert_ms": None,
+    }
 
-        print(f"[INFO] refresh done (fired={fired})")
-        return "ok"
 
-    except Exception as e:
-        print("[ERROR] push notification failed", e)
-        traceback.print_exc()
-        return "push failed", 500
+def crawl_streaming(hot_keys, ctx, timer):
+    """
+    시설 조회가 끝날 때마다 → 그 코트 그룹의 시설이 모두 모이면 바로 매칭/발송
+    (스냅샷 diff 가 (그룹, 날짜)의 전체 코트 기준이라 그룹 단위로 기다린다)
+    """
+    incremental = False if hot_keys is None else None
+    availability = {}
+    failed = set()
+    members = {}
+    waiting = {}
+    group_of = {}
+
+    # 중간에 예외가 나면 close() → 크롤링 스레드를 취소하고 기다린다
+    with closing(stream_all(hot_keys, incremental)) as events:
+        for kind, value in events:
+            if kind == STREAM_FACILITIES:
+                facilities, complete = value
+                ctx["listing_complete"] = complete and bool(facilities)
+                ctx["court_group_map"] = build_court_group_map(facilities)
+                for group, cids in ctx["court_group_map"].items():
+                    if ctx["alarms_by_group"].get(group):
+                        members[group] = cids
+                        waiting[group] = set(cids)
+                        for cid in cids:
+                            group_of[cid] = group
+
+            elif kind == STREAM_AVAILABILITY:
+                rid, data, rid_failed = value
+                if data:
+                    availability[rid] = data
+                failed |= rid_failed
+
+                group = group_of.get(rid)
+                if group is None:
+                    continue
+                waiting[group].discard(rid)
+                if waiting[group]:
+                    continue
+
+                del waiting[group]
+                cids = members[group]
+                group_slots = SlotStore.from_availability({c: availability[c] for c in cids if c in availability})
+                group_failed = {(c, d) for c, d in failed if c in cids}
+                dispatch_alarms(ctx, group_slots, {group: cids}, group_failed, timer)
+
+            else:
+                return value
+
+
+def dispatch_alarms(ctx, slots, court_group_map, failed, timer):
+    """
+    court_group_map 에 있는 그룹들만 스냅샷 diff → 새로 열린 슬롯의 알람만 매칭 → 발송 → 기록
+    """
+    versions = ctx["versions"]
+    version = ctx["version"]
+    alarms_by_group = ctx["alarms_by_group"]
+
+    # ① 매칭
+    with timer.phase("match"):
+        # 조회 실패한 (cid, 날짜)가 있는 (그룹, 날짜)는 이번 사이클에서 제외 (직전 스냅샷 유지)
+        slot_index = build_slot_index(slots, court_group_map, failed)
+        skip = failed_group_keys(court_group_map, failed)
+        opened, closed = versions.diff(slot_index, court_group_map, skip)
+        if not ctx["listing_complete"]:
+            # 목록 일부가 빠졌으면 그룹의 코트도 일부만 조회됐을 수 있다
+            # → 닫힘은 다음 완전한 목록까지 미룬다 (다시 "열림"으로 잡혀 오알림이 나가지 않도록)
+            closed = {}
+        # 첫 스냅샷의 슬롯은 first_seen=0 → 어떤 알람에도 "새 빈자리"가 아니다
+        seen_at = version if ctx["alert"] else 0
+        versions.apply(opened, closed, seen_at)
+        ctx["diffed"].update(court_group_map)
+        ctx["opened"].update(opened)
+        ctx["closed"].update(closed)
+
+        pending = []
+        if ctx["alert"] and any(alarms_by_group.get(g) for g in court_group_map):
+            # 🔑 최근 PUSH_RETRY_CYCLES 사이클 안에 열린 슬롯의 (그룹, 날짜)에 걸린 알람만 본다
+            candidates = versions.recent(court_group_map, version - PUSH_RETRY_CYCLES + 1)
+            pending = plan_alerts(candidates, alarms_by_group, ctx["sent"])
+
+    # ② 발송 (DB 커넥션 없이 병렬로)
+    with timer.phase("push"):
+        subs_map = ctx["subs"]
+        resve_of = slot_resve_ids(slots, court_group_map, pending)
+        jobs = []
+        # 🔑 구독마다 이번에 새로 열린 슬롯을 알림 1건으로 묶는다
+        for subscription_id, new_times in coalesce_pending(pending).items():
+            sub = subs_map.get(subscription_id)
+            if not sub:
+                continue
+            title, body, data, topic = build_alert(subscription_id, new_times, slot_index, resve_of)
+            jobs.append(PushJob(
+                subscription_id,
+                sub,
+                title,
+                body,
+                [(subscription_id, g, d, t) for (g, d), times in new_times.items() for t in times],
+                data,
+                topic,
+            ))
+
+        t0 = time.perf_counter()
+        results, _ = deliver_all(jobs, send_push_notification)
+        ctx["push_elapsed"] += time.perf_counter() - t0
+        ctx["results"].extend(results)
+
+        delivered = []
+        dropped = []
+        expired = set()
+        for r in results:
+            sid = r.job.subscription_id
+            if r.ok:
+                print(f"[INFO] push sent to {sid} | {r.job.title} | {len(r.job.slots)} slots")
+                delivered.extend(r.job.slots)
+            elif r.kind == PERMANENT:
+                # 구독 해지된 브라우저 → 구독/알람 삭제
+                print(f"[WARN] push subscription expired {sid} | {r.error}")
+                expired.add(sid)
+            elif r.kind == PAYLOAD:
+                # 다시 보내도 실패 → sent_slots 에만 넣고 재시도 안 함
+                print(f"[WARN] push rejected {sid} | {r.job.title} | {r.error}")
+                dropped.extend(r.job.slots)
+            else:
+                # 일시적 오류 → 다음 refresh 에서 다시 시도
+                print(f"[WARN] push failed to {sid} | {r.job.title} | {r.error}")
+
+        if delivered and ctx["first_alert_ms"] is None:
+            ctx["first_alert_ms"] = round((time.perf_counter() - ctx["started"]) * 1000, 1)
+
+    # ③ 기록 (일괄 INSERT)
+    with timer.phase("record"):
+        # 보낸 슬롯 / 다시 보내도 실패할 슬롯 → sent_slots (재시도 대상에서 제외)
+        handled = [s for s in delivered + dropped if s[0] not in expired]
+        if handled or expired:
+            with get_db() as conn:
+                with conn.cursor() as cur:
+                    save_sent_slots(cur, handled, catalog)
+                    delete_subscriptions(cur, expired)
+            if expired:
+                print(f"[INFO] pruned {len(expired)} expired subscriptions")
+        ctx["sent"].update((s[0], make_slot_key(s[1], s[2], s[3])) for s in handled)
+
+    # 이후 그룹에서 같은 구독으로 다시 보내지 않도록
+    for sid in expired:
+        subs_map.pop(sid, None)
+    ctx["expired"] |= expired
+    ctx["fired"] += len(delivered)
+
+
+def finish_slot_versions(ctx):
+    """
+    모든 그룹의 diff 를 한 트랜잭션으로 저장하고 스냅샷 버전을 올린다
+    (이 버전 이후 등록한 알람의 기준)
+    """
+    versions = ctx["versions"]
+    seen_at = ctx["version"] if ctx["alert"] else 0
+    with get_db() as conn:
+        with conn.cursor() as cur:
+            save_slot_diff(cur, ctx["opened"], ctx["closed"], seen_at, catalog)
+            save_slot_version(cur, ctx["version"])
+    versions.version = ctx["version"]
+    versions.clean = True
+    CYCLE_SIZE.set(len(versions), kind="snapshot_slots")
+
+
+scheduler = CrawlScheduler(run_cycle)
+# 직전 사이클의 슬롯 스냅샷 (slot_meta.version 이 같으면 DB 에서 다시 읽지 않는다)
+slot_versions_cache = None
+# 알람 / 구독 역인덱스 (워커마다, LISTEN/NOTIFY 로 갱신)
+alarm_registry = AlarmRegistry()
+# 코트그룹 / 시간대 이름 ↔ id (워커마다)
+catalog = Catalog()
+# 지난 알람 / sent_slots 정리는 refresh 와 별개로 (retention.py)
+retention = RetentionWorker()
+
+
+@app.before_request
+def ensure_scheduler_started():
+    scheduler.start()
+    retention.start()
+    alarm_registry.start()
+
+
+def send_test_push():
+    with get_db() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("SELECT * FROM push_subscriptions LIMIT 1")
+            s = cur.fetchone()
+
+    if s:
+        send_push_notification(
+            {
+                "endpoint": s["endpoint"],
+                "keys": {
+                    "p256dh": s["p256dh"],
+                    "auth": s["auth"]
+                }
+            },
+            title="🎾 예약 가능 알림 테스트",
+            body="정상 동작 확인"
+        )
+    else:
+        print("[TEST] push_subscriptions 비어 있음")
 
 # =========================
 # Push 구독 저장 API
@@ -376,6 +783,10 @@ def push_subscribe():
                   p256dh = EXCLUDED.p256dh,
                   auth = EXCLUDED.auth
             """, (sid, endpoint, p256dh, auth))
+            notify_change(cur, {
+                "op": "sub_put", "sid": sid,
+                "endpoint": endpoint, "p256dh": p256dh, "auth": auth,
+            })
 
     return jsonify({"subscription_id": sid})
 
@@ -399,11 +810,24 @@ def alarm_add():
     try:
         with get_db() as conn:
             with conn.cursor() as cur:
+                # 크롤링 없이 카탈로그로 코트그룹 확인
+                group_id = find_court_group(cur, court_group)
+                if group_id is None:
+                    return jsonify({"error": "unknown court_group"}), 400
+
+                # 지금 스냅샷 버전에 이미 있던 빈자리는 알림 대상이 아니다
                 cur.execute("""
-                    INSERT INTO alarms (subscription_id, court_group, date)
-                    VALUES (%s, %s, %s)
+                    INSERT INTO alarms (subscription_id, court_group_id, date, armed_version)
+                    SELECT %s, %s, %s, version FROM slot_meta WHERE id = 1
                     ON CONFLICT DO NOTHING
-                """, (subscription_id, court_group, date))
+                    RETURNING armed_version
+                """, (subscription_id, group_id, date))
+                row = cur.fetchone()
+                if row:
+                    notify_change(cur, {
+                        "op": "alarm_add", "sid": subscription_id,
+                        "group": court_group, "date": date, "armed": row[0],
+                    })
             conn.commit()
 
         return jsonify({"status": "added"})
@@ -424,10 +848,11 @@ def alarm_list():
     with get_db() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute("""
-                SELECT court_group, date, created_at
-                FROM alarms
-                WHERE subscription_id = %s
-                ORDER BY created_at DESC
+                SELECT g.name AS court_group, a.date, a.created_at
+                FROM alarms a
+                JOIN court_groups g ON g.id = a.court_group_id
+                WHERE a.subscription_id = %s
+                ORDER BY a.created_at DESC
             """, (subscription_id,))
             rows = cur.fetchall()
 
@@ -450,9 +875,16 @@ def alarm_delete():
     with get_db() as conn:
         with conn.cursor() as cur:
             cur.execute("""
-                DELETE FROM alarms
-                WHERE subscription_id=%s AND court_group=%s AND date=%s
+                DELETE FROM alarms a
+                USING court_groups g
+                WHERE g.id = a.court_group_id
+                  AND a.subscription_id=%s AND g.name=%s AND a.date=%s
             """, (subscription_id, court_group, date))
+            if cur.rowcount:
+                notify_change(cur, {
+                    "op": "alarm_del", "sid": subscription_id,
+                    "group": court_group, "date": date,
+                })
 
     return jsonify({"status": "deleted"})
 # =========================
@@ -462,6 +894,12 @@ def alarm_delete():
 def health():
     return "ok"
 
+
+@app.route("/metrics")
+def metrics():
+    # 모든 워커의 메트릭 파일 합산 (Prometheus text format)
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
 # =========================
 # 안전한 JSON 로드/저장
 # =========================
@@ -490,8 +928,28 @@ def safe_save(path, data):
 # =========================
 # 전체 크롤링 실행
 # =========================
-def crawl_all():
-    return run_all() 
+def crawl_all(hot_keys=None):
+    # 알람 대상을 모르면 증분 모드를 끄고 전체 조회
+    if hot_keys is None:
+        return run_all(incremental=False)
+    return run_all(hot_keys=hot_keys)
+
+
+def load_hot_keys(alarms_by_group):
+    """
+    알람이 걸린 (코트그룹, 날짜) → 매 사이클 조회할 {(cid, date), ...}
+    (그룹 → cid 매핑은 직전 크롤링 결과 기준)
+    """
+    court_group_map = build_court_group_map(current_cache()["facilities"])
+    if not court_group_map:
+        return set()
+
+    hot_keys = set()
+    for group, dates in alarms_by_group.items():
+        for cid in court_group_map.get(group, []):
+            for date in dates:
+                hot_keys.add((cid, date))
+    return hot_keys
 
 # =========================
 def make_reserve_link(resve_id):
@@ -505,77 +963,124 @@ def make_reserve_link(resve_id):
         f"&checkSearchMonthNow=false"
     )
 # =========================
-#  알림 전송
+#  알림 내용 (구독별 묶음)
 # =========================
-def send_push_notification(subscription, title, body):
-    payload = json.dumps({
-        "title": title,
-        "body": body
-    })
+# 알림 1건에 넣을 슬롯 수 상한 (push payload 는 4KB 정도까지)
+ALERT_MAX_SLOTS = int(os.environ.get("ALERT_MAX_SLOTS", "24"))
+ALERT_MAX_BYTES = 3000
 
-    webpush(
-        subscription_info=subscription,
-        data=payload,
-        vapid_private_key=VAPID_PRIVATE_KEY,
-        vapid_claims={
-            "sub": "mailto:ccoo2000@naver.com"
-        }
-    )
 
-# =========================
-# 기준선 슬롯 존재 여부 확인
-# =========================
+def slot_resve_ids(slots, court_group_map, pending):
+    """
+    발송할 (코트그룹, 날짜)의 시간대 → resveId (그룹 안 첫 코트 기준, 예약 링크용)
+    """
+    keys = {(g, d) for _, g, d, _ in pending}
+    resve_of = {}
+    for group, date in keys:
+        for cid in court_group_map.get(group, ()):
+            for t, resve_id in slots.slots_for(cid, date):
+                if resve_id:
+                    resve_of.setdefault((group, date, t), resve_id)
+    return resve_of
 
-def is_in_baseline(cur, subscription_id, cid, date, time_content):
-    cur.execute("""
-        SELECT 1
-        FROM baseline_slots
-        WHERE subscription_id = %s
-          AND cid = %s
-          AND date = %s
-          AND time_content = %s
-        LIMIT 1
-    """, (subscription_id, cid, date, time_content))
 
-    return cur.fetchone() is not None
+def short_date(date):
+    # "20251222" → "12/22"
+    return f"{date[4:6]}/{date[6:8]}" if len(date) == 8 else date
 
-# =========================
-# 기준선 슬롯 추가
-# =========================
-def add_to_baseline(cur, subscription_id, court_group, date, time_content):
-    cur.execute("""
-        INSERT INTO baseline_slots
-            (subscription_id, court_group, date, time_content)
-        VALUES (%s, %s, %s, %s)
-        ON CONFLICT DO NOTHING
-    """, (subscription_id, court_group, date, time_content))
 
+def build_alert(subscription_id, new_times, slot_index, resve_of):
+    """
+    new_times: {(court_group, date): [새로 열린 time, ...]}
+    slot_index: {(court_group, date): {지금 열려 있는 time, ...}}
+    → (title, body, data, topic)
 
-# =========================
-# 기준선 슬롯 정리
-# =========================
-def cleanup_old_alarm_data(cur):
-    today = datetime.now(KST).strftime("%Y%m%d")
+    data.slots 에는 (그룹, 날짜)별로 지금 열려 있는 시간대 전체를 new 표시와 함께 넣는다.
+    → 같은 topic/tag 의 이전 알림을 새 알림으로 바꿔도 정보가 사라지지 않는다.
+    """
+    keys = sorted(new_times)
+    total = sum(len(times) for times in new_times.values())
+
+    if len(keys) == 1:
+        group, date = keys[0]
+        title = f"🎾 {group} {short_date(date)} {total}자리 예약 가능"
+        body = ", ".join(new_times[keys[0]])
+    else:
+        title = f"🎾 예약 가능 {total}자리"
+        body = "\n".join(
+            f"{g} {short_date(d)}: {len(new_times[(g, d)])}자리 ({', '.join(new_times[(g, d)])})"
+            for g, d in keys
+        )
+
+    slot_list = []
+    links = {}
+    url = None
+    for group, date in keys:
+        fresh = set(new_times[(group, date)])
+        for t in sorted(slot_index.get((group, date)) or fresh):
+            resve_id = resve_of.get((group, date, t))
+            if resve_id and resve_id not in links:
+                links[resve_id] = make_reserve_link(resve_id)
+            if url is None and t in fresh and resve_id:
+                url = links[resve_id]
+            slot_list.append({"group": group, "date": date, "time": t, "resveId": resve_id, "new": t in fresh})
+
+    # 너무 길면 새 슬롯 위주로 자른다
+    if len(slot_list) > ALERT_MAX_SLOTS:
+        slot_list = sorted(slot_list, key=lambda x: not x["new"])[:ALERT_MAX_SLOTS]
+        used = {x["resveId"] for x in slot_list}
+        links = {r: u for r, u in links.items() if r in used}
+
+    topic = make_topic(*(f"{g}:{d}" for g, d in keys))
+    data = {
+        "tag": topic,
+        "url": url or "/",
+        "slots": slot_list,
+        "links": links,
+    }
+    # 그래도 크면 링크 목록 → 슬롯 목록 순으로 줄인다 (url 은 남김)
+    while len(json.dumps([title, body, data], ensure_ascii=False).encode("utf-8")) > ALERT_MAX_BYTES:
+        if data["links"]:
+            data["links"] = {}
+        elif data["slots"]:
+            data["slots"] = data["slots"][:len(data["slots"]) // 2]
+        else:
+            break
+    return title, body, data, topic
 
-    cur.execute("""
-        DELETE FROM alarms
-        WHERE date < %s
-    """, (today,))
 
-    cur.execute("""
-        DELETE FROM baseline_slots
-        WHERE date < %s
-    """, (today,))
+# =========================
+#  알림 전송
+# =========================
+# VAPID 헤더 / push 서비스 커넥션 재사용 (push_transport.py)
+push_transport = PushTransport("mailto:ccoo2000@naver.com")
 
-    cur.execute("""
-        DELETE FROM sent_slots
-        WHERE sent_at < NOW() - INTERVAL '1 day';
-    """, (f"%|{today}%",))
 
+def send_push_notification(subscription, title, body, timeout=None, data=None, topic=None):
+    payload = json.dumps({
+        "title": title,
+        "body": body,
+        **(data or {}),
+    }, ensure_ascii=False)
+
+    # Topic: 아직 전달 안 된 같은 topic 메시지는 push 서비스가 새 것으로 대체
+    headers = {"Urgency": PUSH_URGENCY}
+    if topic:
+        headers["Topic"] = topic
+
+    push_transport.send(
+        subscription,
+        payload,
+        VAPID_PRIVATE_KEY,
+        headers=headers,
+        ttl=PUSH_TTL,
+        timeout=timeout
+    )
 
 # =========================
 # 코트 그룹 추출
 # =========================
+@lru_cache(maxsize=4096)
 def get_court_group(title: str) -> str:
     if not title:
         return ""
@@ -611,25 +1116,6 @@ def build_court_group_map(facilities: dict) -> dict:
 
     return group_map
 
-# =========================
-# 슬롯 평탄화
-# =========================
-def flatten_slots(facilities, availability):
-    slots = []
-    for cid, days in availability.items():
-        title = facilities.get(cid, {}).get("title", "")
-        for date, items in days.items():
-            for s in items:
-                slots.append({
-                    "cid": cid,
-                    "court_title": title,
-                    "date": date,
-                    "time": s["timeContent"],
-                    "key": f"{cid}|{date}|{s['timeContent']}",
-                    "is_test": s.get("is_test", False)
-                })
-    return slots
-
 
 def inject_test_slot_1(facilities, availability):
     # 🔥 반드시 문자열
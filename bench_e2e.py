@@ -0,0 +1,354 @@
+"""
+크롤링 → 매칭 → push 전체 사이클 벤치마크
+
+replay_server.py 를 같은 프로세스에 띄우고 run_cycle() 을 여러 번 돌린다.
+  - 사이트: 녹화된 시설 목록 / resveTmList 재생 (지연, 오류율, 사이클 간 churn)
+  - push: 재생 서버의 가짜 엔드포인트 (/push/<id>)
+  - DB: 메모리 stand-in (bench_refresh_db.py 와 같은 방식)
+
+첫 사이클은 슬롯 스냅샷만 만들고, 이후 사이클마다 churn 으로 생긴 슬롯에 알림이 나간다.
+
+    python bench_e2e.py --facilities 200 --days 30 --subscriptions 500 --alarms 3000 --cycles 4
+    python bench_e2e.py --latency 80 --jitter 40 --error-rate 0.02 --json
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    # 규모
+    p.add_argument("--facilities", type=int, default=80)
+    p.add_argument("--courts", type=int, default=2, help="그룹당 코트 수")
+    p.add_argument("--days", type=int, default=30, help="크롤링할 날짜 수 (내일부터)")
+    p.add_argument("--subscriptions", type=int, default=300)
+    p.add_argument("--alarms", type=int, default=1500)
+    p.add_argument("--cycles", type=int, default=3)
+    # 재생 서버
+    p.add_argument("--fill", type=float, default=0.4)
+    p.add_argument("--churn", type=float, default=0.05)
+    p.add_argument("--latency", type=float, default=20.0, help="ms")
+    p.add_argument("--jitter", type=float, default=10.0, help="ms")
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--throttle-rate", type=float, default=0.0)
+    p.add_argument("--push-latency", type=float, default=30.0, help="ms")
+    p.add_argument("--push-gone-rate", type=float, default=0.0)
+    # 크롤러
+    p.add_argument("--host-rate", type=float, default=None, help="CRAWL_HOST_RATE (기본: 운영 설정 그대로)")
+    p.add_argument("--full", action="store_true", help="증분 크롤링 끄기")
+    p.add_argument("--batch", action="store_true", help="STREAM_MATCH=0 (크롤링 후 한 번에 매칭)")
+    p.add_argument("--no-registry", action="store_true", help="알람 레지스트리 없이 매 사이클 DB 에서 알람/구독 로드")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--json", action="store_true", help="사이클별 요약을 JSON 으로 출력")
+    return p.parse_args()
+
+
+ARGS = parse_args()
+PORT = free_port()
+WORKDIR = tempfile.mkdtemp(prefix="tennis_bench_")
+
+# tennis_core / app 은 import 시점에 설정을 읽는다
+os.environ["CRAWL_SITE_ROOT"] = f"http://127.0.0.1:{PORT}"
+if ARGS.host_rate is not None:
+    os.environ["CRAWL_HOST_RATE"] = str(ARGS.host_rate)
+os.environ["CRAWL_INCREMENTAL"] = "0" if ARGS.full else "1"
+os.environ["STREAM_MATCH"] = "0" if ARGS.batch else "1"
+# 캐시 / 스냅샷 / lock / 메트릭 파일은 전부 procutil.APP_DIR 아래
+os.environ["TENNIS_APP_DIR"] = WORKDIR
+
+from cryptography.hazmat.primitives import serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import ec  # noqa: E402
+from py_vapid import Vapid, b64urlencode  # noqa: E402
+
+import app  # noqa: E402
+import catalog  # noqa: E402
+import tennis_core  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from replay_server import ReplayServer  # noqa: E402
+from scheduler import PhaseTimer  # noqa: E402
+
+
+# =========================
+# 메모리 DB stand-in
+# =========================
+class MemoryDB:
+    """
+    run_cycle() 이 내는 쿼리만 이해하는 메모리 DB
+    """
+
+    def __init__(self):
+        self.alarms = []
+        self.subs = {}
+        self.groups = {}     # court_groups: name → id
+        self.times = {}      # slot_times: time_content → id
+        self.facilities = {}
+        self.snapshot = {}   # (court_group_id, date, time_id) → first_seen
+        self.version = 0
+        self.sent = set()    # (subscription_id, court_group_id, date, time_id)
+        self.round_trips = 0
+
+    @contextmanager
+    def connect(self):
+        yield _MemoryConn(self)
+
+
+class _MemoryConn:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, cursor_factory=None):
+        # RealDictCursor 자리에는 dict 행, 기본 커서 자리에는 tuple 행을 그대로 돌려준다
+        return _MemoryCursor(self.db)
+
+    def commit(self):
+        pass
+
+
+class _MemoryCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        db = self.db
+        db.round_trips += 1
+        self.rows = []
+
+        group_names = {v: k for k, v in db.groups.items()}
+        time_names = {v: k for k, v in db.times.items()}
+
+        if "UNION ALL" in sql:
+            self.rows = [("g", i, n) for n, i in db.groups.items()] + [("t", i, n) for n, i in db.times.items()]
+        elif "INSERT INTO court_groups" in sql or "INSERT INTO slot_times" in sql:
+            table = db.groups if "court_groups" in sql else db.times
+            for name in params[0]:
+                table.setdefault(name, len(table) + 1)
+            self.rows = [(table[name], name) for name in params[0]]
+        elif "INSERT INTO facilities" in sql:
+            db.facilities.update(zip(params[0], params[1]))
+        elif "FROM sent_slots" in sql and sql.lstrip().startswith("SELECT"):
+            sids = {a["subscription_id"] for a in db.alarms}
+            self.rows = [
+                {"subscription_id": s, "court_group": group_names[g], "date": d, "time_content": time_names[t]}
+                for (s, g, d, t) in db.sent if s in sids
+            ]
+        elif "SELECT version FROM slot_meta" in sql:
+            self.rows = [{"version": db.version}]
+        elif "FROM slot_snapshot" in sql and sql.lstrip().startswith("SELECT"):
+            self.rows = [
+                {"court_group": group_names[g], "date": d, "time_content": time_names[t], "first_seen": v}
+                for (g, d, t), v in db.snapshot.items()
+            ]
+        elif "DELETE FROM slot_snapshot" in sql:
+            for key in zip(*params):
+                db.snapshot.pop(key, None)
+        elif "INSERT INTO slot_snapshot" in sql:
+            version, *cols = params
+            for key in zip(*cols):
+                db.snapshot[key] = version
+        elif "UPDATE slot_meta" in sql:
+            db.version = params[0]
+        elif "FROM alarms" in sql and sql.lstrip().startswith("SELECT"):
+            self.rows = list(db.alarms)
+        elif "FROM push_subscriptions" in sql and sql.lstrip().startswith("SELECT"):
+            self.rows = list(db.subs.values())
+        elif "INSERT INTO sent_slots" in sql:
+            db.sent.update(zip(*params))
+        elif "= ANY(%s)" in sql:
+            sids = set(params[0])
+            if "FROM alarms" in sql:
+                db.alarms = [a for a in db.alarms if a["subscription_id"] not in sids]
+            elif "FROM sent_slots" in sql:
+                db.sent = {s for s in db.sent if s[0] not in sids}
+            elif "FROM push_subscriptions" in sql:
+                for sid in sids:
+                    db.subs.pop(sid, None)
+        # 그 외(pg_notify, 정리용 DELETE 등)는 무시
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+# =========================
+# 합성 구독 / 알람
+# =========================
+def make_subscription(push_url, i):
+    # 실제 암호화가 되도록 브라우저처럼 P-256 키를 만든다
+    key = ec.generate_private_key(ec.SECP256R1())
+    p256dh = key.public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+    )
+    return {
+        "id": f"bench{i:05d}",
+        "endpoint": f"{push_url}/push/bench{i:05d}",
+        "p256dh": base64.urlsafe_b64encode(p256dh).decode().rstrip("="),
+        "auth": base64.urlsafe_b64encode(os.urandom(16)).decode().rstrip("="),
+    }
+
+
+def make_vapid_key():
+    v = Vapid()
+    v.generate_keys()
+    return b64urlencode(v.private_key.private_numbers().private_value.to_bytes(32, "big"))
+
+
+def seed_db(db, server, dates, args):
+    rnd = random.Random(args.seed)
+    for i in range(args.subscriptions):
+        sub = make_subscription(server.url, i)
+        db.subs[sub["id"]] = sub
+
+    groups = sorted(app.build_court_group_map(server.facilities))
+    sids = sorted(db.subs)
+    seen = set()
+    while len(db.alarms) < min(args.alarms, len(sids) * len(groups) * len(dates)):
+        key = (rnd.choice(sids), rnd.choice(groups), rnd.choice(dates))
+        if key in seen:
+            continue
+        seen.add(key)
+        db.alarms.append({
+            "id": len(db.alarms) + 1,
+            "subscription_id": key[0],
+            "court_group": key[1],
+            "date": key[2],
+            "armed_version": 0,
+        })
+    return groups
+
+
+def load_registry(db):
+    # LISTEN 이 붙은 워커처럼: 레지스트리를 한 번 채워 두고 사이클은 DB 에서 알람/구독을 읽지 않는다
+    from alarm_registry import read_alarm_tables
+    with db.connect() as conn:
+        with conn.cursor() as cur:
+            app.alarm_registry.load(*read_alarm_tables(cur))
+    app.alarm_registry._listening = True
+
+
+# =========================
+# 실행
+# =========================
+def crawl_request_stats(delta):
+    requests = sum(v for k, v in delta.items() if k.startswith("tennis_crawl_requests_total"))
+    errors = sum(
+        v for k, v in delta.items()
+        if k.startswith("tennis_crawl_requests_total") and 'outcome="ok"' not in k and 'outcome="empty"' not in k
+    )
+    count = delta.get('tennis_crawl_request_seconds_count{endpoint="times"}', 0)
+    total = delta.get('tennis_crawl_request_seconds_sum{endpoint="times"}', 0.0)
+    return requests, errors, (total / count * 1000 if count else 0.0)
+
+
+def run_cycles(args, server, db):
+    reports = []
+    for i in range(args.cycles):
+        if i:
+            server.advance()
+
+        timer = PhaseTimer()
+        before = METRICS.sample()
+        round_trips = db.round_trips
+        t0 = time.perf_counter()
+        result = app.run_cycle({}, timer)
+        elapsed = time.perf_counter() - t0
+        delta = METRICS.delta(before)
+
+        requests, errors, avg_ms = crawl_request_stats(delta)
+        crawl_s = timer.phases.get("crawl", 0) / 1000
+        push = result["push"]
+        reports.append({
+            "cycle": i,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "phases": timer.phases,
+            "requests": requests,
+            "request_errors": errors,
+            "requests_per_s": round(requests / crawl_s, 1) if crawl_s else 0.0,
+            "times_avg_ms": round(avg_ms, 1),
+            "db_round_trips": db.round_trips - round_trips,
+            "snapshot_rows": len(db.snapshot),
+            "fired": result["fired"],
+            "pushes": push["total"],
+            "expired": result["expired"],
+            "first_alert_ms": result["first_alert_ms"],
+            "push_throughput_per_s": push["throughput_per_s"],
+            "push_p50_ms": push["p50_ms"],
+            "push_p95_ms": push["p95_ms"],
+        })
+    return reports
+
+
+def main(args):
+    server = ReplayServer(
+        args.facilities, args.courts, args.fill, args.churn,
+        args.latency, args.jitter, args.error_rate, args.throttle_rate,
+        args.push_latency, args.push_gone_rate, args.seed,
+    )
+    server.start(port=PORT)
+
+    # 날짜 범위 / DB / VAPID 키를 벤치마크용으로 교체
+    dates = tennis_core.crawl_dates()[:args.days]
+    tennis_core.crawl_dates = lambda today=None: dates
+
+    db = MemoryDB()
+    app.get_db = db.connect
+    catalog.get_db = db.connect
+    app.VAPID_PRIVATE_KEY = make_vapid_key()
+    groups = seed_db(db, server, dates, args)
+    if not args.no_registry:
+        load_registry(db)
+
+    print(
+        f"[BENCH] facilities={len(server.facilities)} groups={len(groups)} days={len(dates)} "
+        f"subscriptions={len(db.subs)} alarms={len(db.alarms)} "
+        f"mode={'batch' if args.batch else 'streaming'} incremental={not args.full} "
+        f"registry={not args.no_registry}",
+        file=sys.stderr,
+    )
+
+    try:
+        # --json 이면 stdout 은 결과 JSON 만 (앱 로그는 stderr 로)
+        with redirect_stdout(sys.stderr if args.json else sys.stdout):
+            reports = run_cycles(args, server, db)
+    finally:
+        server.stop()
+
+    if args.json:
+        print(json.dumps({"args": vars(args), "cycles": reports}, ensure_ascii=False, indent=2))
+        return
+
+    for r in reports:
+        first = "-" if r["first_alert_ms"] is None else f"{r['first_alert_ms']:.0f}ms"
+        print(
+            f"[BENCH] cycle {r['cycle']}: {r['elapsed_ms']:.0f} ms "
+            f"crawl={r['phases'].get('crawl', 0):.0f}ms "
+            f"req={r['requests']} ({r['requests_per_s']}/s, avg {r['times_avg_ms']}ms, err {r['request_errors']}) "
+            f"db={r['db_round_trips']} snapshot={r['snapshot_rows']} fired={r['fired']} pushes={r['pushes']} first_alert={first} "
+            f"push={r['push_throughput_per_s']}/s p95={r['push_p95_ms']}ms"
+        )
+
+
+if __name__ == "__main__":
+    main(ARGS)
@@ -0,0 +1,180 @@
+"""
+알람 매칭 벤치마크
+
+합성 시설/슬롯/알람을 만들어 기존 중첩 루프 방식과
+(court_group, date) 인덱스 방식의 매칭 시간을 비교한다.
+
+    python bench_matching.py --alarms 5000 --groups 20 --courts 2 --days 60
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from alarm_engine import build_slot_index
+from slot_store import SlotStore
+
+TIMES = [f"{h:02d}:00 ~ {h + 2:02d}:00" for h in range(6, 22, 2)]
+
+
+def make_data(groups, courts, days, fill, seed):
+    rnd = random.Random(seed)
+    start = datetime(2025, 12, 1)
+    dates = [(start + timedelta(days=i)).strftime("%Y%m%d") for i in range(days)]
+
+    facilities = {}
+    availability = {}
+    court_group_map = {}
+    cid = 10000
+    for g in range(groups):
+        group = f"그룹{g:02d}"
+        for c in range(courts):
+            cid += 1
+            rid = str(cid)
+            facilities[rid] = {"title": f"[유료]{group}테니스장 {c + 1}번", "location": ""}
+            court_group_map.setdefault(group, []).append(rid)
+
+            days_map = {}
+            for d in dates:
+                slots = [{"timeContent": t, "resveId": rid} for t in TIMES if rnd.random() < fill]
+                if slots:
+                    days_map[d] = slots
+            if days_map:
+                availability[rid] = days_map
+
+    return facilities, availability, court_group_map, dates
+
+
+def make_alarms(n, groups, dates, seed):
+    rnd = random.Random(seed + 1)
+    return [
+        {
+            "subscription_id": f"sub{i % max(1, n // 3)}",
+            "court_group": f"그룹{rnd.randrange(groups):02d}",
+            "date": rnd.choice(dates),
+        }
+        for i in range(n)
+    ]
+
+
+def flatten(facilities, availability):
+    slots = []
+    for cid, days in availability.items():
+        for date, items in days.items():
+            for s in items:
+                slots.append({"cid": cid, "date": date, "time": s["timeContent"]})
+    return slots
+
+
+def legacy_match(alarms, facilities, availability, court_group_map):
+    # refresh()의 기존 방식: 알람마다 전체 슬롯 리스트를 스캔
+    current_slots = flatten(facilities, availability)
+    matched = {}
+    for alarm in alarms:
+        group_cids = court_group_map.get(alarm["court_group"], [])
+        if not group_cids:
+            continue
+        times = {
+            slot["time"]
+            for slot in current_slots
+            if slot["cid"] in group_cids and slot["date"] == alarm["date"]
+        }
+        if times:
+            matched[(alarm["subscription_id"], alarm["court_group"], alarm["date"])] = times
+    return matched
+
+
+def match_alarms(alarms, slot_index):
+    """
+    알람별로 (그룹, 날짜) 인덱스를 조회 (스냅샷 diff 이전의 매칭 방식, 비교용)
+    alarms: [{"subscription_id", "court_group", "date"}, ...]
+    → {(subscription_id, court_group, date): {time, ...}}
+    """
+    matched = {}
+    for alarm in alarms:
+        key = (alarm["court_group"], alarm["date"])
+        times = slot_index.get(key)
+        if not times:
+            continue
+        matched[(alarm["subscription_id"], key[0], key[1])] = times
+    return matched
+
+
+def indexed_match(alarms, availability, court_group_map):
+    slot_index = build_slot_index(SlotStore.from_availability(availability), court_group_map)
+    return match_alarms(alarms, slot_index)
+
+
+def legacy_cache(facilities, availability):
+    # 기존 refresh: CACHE 용 중첩 dict 재생성 + flatten_slots + json.dumps
+    cache = {
+        cid: {d: [{"timeContent": s["timeContent"], "resveId": s["resveId"]} for s in items]
+              for d, items in days.items()}
+        for cid, days in availability.items()
+    }
+    flat = [
+        {"cid": cid, "date": d, "time": s["timeContent"], "key": f"{cid}|{d}|{s['timeContent']}"}
+        for cid, days in cache.items() for d, items in days.items() for s in items
+    ]
+    return json.dumps(cache, ensure_ascii=False, separators=(",", ":")), flat
+
+
+def store_cache(availability):
+    store = SlotStore.from_availability(availability)
+    return store.to_json(), store
+
+
+def timed(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, result
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--alarms", type=int, default=3000)
+    p.add_argument("--groups", type=int, default=20)
+    p.add_argument("--courts", type=int, default=2)
+    p.add_argument("--days", type=int, default=60)
+    p.add_argument("--fill", type=float, default=0.4)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--skip-legacy", action="store_true")
+    args = p.parse_args()
+
+    facilities, availability, court_group_map, dates = make_data(
+        args.groups, args.courts, args.days, args.fill, args.seed
+    )
+    alarms = make_alarms(args.alarms, args.groups, dates, args.seed)
+    n_slots = sum(len(v) for days in availability.values() for v in days.values())
+
+    print(f"[BENCH] facilities={len(facilities)} slots={n_slots} alarms={len(alarms)}")
+
+    t_idx, res_idx = timed(lambda: indexed_match(alarms, availability, court_group_map), args.repeat)
+    print(f"[BENCH] indexed: {t_idx * 1000:.2f} ms  matched={len(res_idx)}")
+
+    t_store, (body_store, store) = timed(lambda: store_cache(availability), args.repeat)
+    t_dict, (body_dict, _) = timed(lambda: legacy_cache(facilities, availability), args.repeat)
+    print(
+        f"[BENCH] cache build+json: store {t_store * 1000:.2f} ms / dict {t_dict * 1000:.2f} ms"
+        f"  same_json={body_store == body_dict}"
+        f"  stored store={len(json.dumps(store.to_state())) // 1024}KB"
+        f" dict={len(json.dumps(availability, ensure_ascii=False)) // 1024}KB"
+    )
+
+    if not args.skip_legacy:
+        t_old, res_old = timed(
+            lambda: legacy_match(alarms, facilities, availability, court_group_map), args.repeat
+        )
+        print(f"[BENCH] legacy : {t_old * 1000:.2f} ms  matched={len(res_old)}")
+        print(f"[BENCH] speedup: x{t_old / t_idx:.1f}  same_result={res_old == res_idx}")
+
+
+if __name__ == "__main__":
+    main()
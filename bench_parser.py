@@ -0,0 +1,59 @@
+"""
+시설 목록 HTML 파서 벤치마크
+
+fixtures/facility_list_page*.html 을 각 백엔드로 파싱해서
+결과가 bs4(기존 구현)와 같은지 확인하고 페이지당 파싱 시간을 비교한다.
+
+    python bench_parser.py --repeat 50
+"""
+import argparse
+import glob
+import os
+import time
+
+from facility_parser import PARSERS
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_pages(pattern):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, pattern))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append(f.read())
+    return pages
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--repeat", type=int, default=30)
+    p.add_argument("--pattern", default="facility_list_page*.html")
+    args = p.parse_args()
+
+    pages = load_pages(args.pattern)
+    if not pages:
+        print(f"[BENCH] no fixtures matching {args.pattern} in {FIXTURE_DIR}")
+        return
+
+    expected = [PARSERS["bs4"](html) for html in pages]
+    n_items = sum(len(r) for r in expected)
+    print(f"[BENCH] pages={len(pages)} facilities={n_items} repeat={args.repeat}")
+
+    base = None
+    for name, parser in PARSERS.items():
+        same = [parser(html) for html in pages] == expected
+
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            for html in pages:
+                parser(html)
+        per_page = (time.perf_counter() - t0) / (args.repeat * len(pages))
+
+        if name == "bs4":
+            base = per_page
+        speedup = f"x{base / per_page:.1f}" if base else "-"
+        print(f"[BENCH] {name:<10} {per_page * 1000:7.3f} ms/page  same_output={same}  vs_bs4={speedup}")
+
+
+if __name__ == "__main__":
+    main()
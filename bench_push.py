@@ -0,0 +1,183 @@
+"""
+push 전송 마이크로벤치마크
+
+replay_server.py 의 가짜 push 엔드포인트(/push/<id>)로 같은 메시지를 보내서
+건당 비용을 비교한다.
+  - webpush: 건마다 webpush() (VAPID 키 파싱 + JWT 서명 + 새 커넥션)
+  - transport: PushTransport (audience 별 VAPID 헤더 캐시 + keep-alive 세션)
+
+로컬 HTTP 라서 TLS 핸드셰이크 비용은 빠져 있다 (실제 push 서비스에서는 차이가 더 크다).
+cpu 는 같은 프로세스의 재생 서버 몫까지 포함한다.
+
+    python bench_push.py --messages 500 --workers 16
+    python bench_push.py --messages 2000 --push-latency 20 --json
+"""
+import argparse
+import base64
+import json
+import os
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from py_vapid import Vapid, b64urlencode
+from pywebpush import WebPusher, webpush
+
+from push_delivery import PushJob, deliver_all
+from push_transport import PushTransport
+from replay_server import ReplayServer
+
+CLAIMS_SUB = "mailto:bench@example.com"
+
+
+def make_subscription(push_url, i):
+    # 실제 암호화가 되도록 브라우저처럼 P-256 키를 만든다
+    key = ec.generate_private_key(ec.SECP256R1())
+    p256dh = key.public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+    )
+    return {
+        "endpoint": f"{push_url}/push/bench{i:05d}",
+        "keys": {
+            "p256dh": base64.urlsafe_b64encode(p256dh).decode().rstrip("="),
+            "auth": base64.urlsafe_b64encode(os.urandom(16)).decode().rstrip("="),
+        },
+    }
+
+
+def make_vapid_key():
+    v = Vapid()
+    v.generate_keys()
+    return b64urlencode(v.private_key.private_numbers().private_value.to_bytes(32, "big"))
+
+
+def make_payload(i):
+    return json.dumps({
+        "title": "🎾 남사 12/22 3자리 예약 가능",
+        "body": "06:00 ~ 08:00, 08:00 ~ 10:00, 10:00 ~ 12:00",
+        "tag": f"bench{i % 50}",
+        "url": "/",
+    }, ensure_ascii=False)
+
+
+# =========================
+# 전송 방식
+# =========================
+def legacy_sender(private_key):
+    def send(subscription, title, body, timeout=None, data=None, topic=None):
+        webpush(
+            subscription_info=subscription,
+            data=body,
+            vapid_private_key=private_key,
+            vapid_claims={"sub": CLAIMS_SUB},
+            timeout=timeout,
+            ttl=900,
+            headers={"Urgency": "high", "Topic": topic},
+        )
+    return send
+
+
+def transport_sender(private_key):
+    transport = PushTransport(CLAIMS_SUB)
+
+    def send(subscription, title, body, timeout=None, data=None, topic=None):
+        transport.send(
+            subscription, body, private_key,
+            headers={"Urgency": "high", "Topic": topic}, ttl=900, timeout=timeout,
+        )
+    return send
+
+
+# =========================
+# 측정
+# =========================
+def bench_parts(subs, private_key, n):
+    """
+    건당 CPU 비용 분해 (네트워크 제외)
+    """
+    t0 = time.perf_counter()
+    for i in range(n):
+        Vapid.from_string(private_key=private_key).sign({"sub": CLAIMS_SUB, "aud": "http://127.0.0.1"})
+    sign = (time.perf_counter() - t0) / n
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        WebPusher(subs[i % len(subs)]).encode(make_payload(i).encode("utf-8"))
+    encrypt = (time.perf_counter() - t0) / n
+
+    return {"vapid_sign_ms": round(sign * 1000, 3), "encrypt_ms": round(encrypt * 1000, 3)}
+
+
+def bench_mode(name, send, server, subs, n, workers):
+    peers_before = len(server.push_peers)
+    jobs = [
+        PushJob(f"bench{i:05d}", subs[i % len(subs)], "", make_payload(i), [], None, f"topic{i % 50}")
+        for i in range(n)
+    ]
+
+    t0 = time.perf_counter()
+    results, stats = deliver_all(jobs, send, workers=workers)
+    elapsed = time.perf_counter() - t0
+
+    failed = [r for r in results if not r.ok]
+    if failed:
+        raise RuntimeError(f"{name}: {len(failed)} pushes failed, e.g. {failed[0].error}")
+
+    return {
+        "mode": name,
+        "messages": n,
+        "workers": workers,
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "per_message_ms": round(elapsed * 1000 / n, 3),
+        "cpu_per_message_ms": None,
+        "throughput_per_s": stats["throughput_per_s"],
+        "p50_ms": stats["p50_ms"],
+        "p95_ms": stats["p95_ms"],
+        "new_connections": len(server.push_peers) - peers_before,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--messages", type=int, default=500)
+    p.add_argument("--subscriptions", type=int, default=50)
+    p.add_argument("--workers", type=int, default=16)
+    p.add_argument("--push-latency", type=float, default=0.0, help="ms")
+    p.add_argument("--json", action="store_true")
+    args = p.parse_args()
+
+    server = ReplayServer(push_latency=args.push_latency)
+    url = server.start()
+    try:
+        private_key = make_vapid_key()
+        subs = [make_subscription(url, i) for i in range(args.subscriptions)]
+        parts = bench_parts(subs, private_key, min(args.messages, 200))
+
+        reports = []
+        for name, factory in [("webpush", legacy_sender), ("transport", transport_sender)]:
+            for workers in (1, args.workers):
+                send = factory(private_key)
+                # 워밍업 (import / 첫 커넥션 비용 제외)
+                bench_mode(name, send, server, subs, min(10, args.messages), 1)
+                t0 = time.process_time()
+                r = bench_mode(name, send, server, subs, args.messages, workers)
+                r["cpu_per_message_ms"] = round((time.process_time() - t0) * 1000 / args.messages, 3)
+                reports.append(r)
+    finally:
+        server.stop()
+
+    if args.json:
+        print(json.dumps({"args": vars(args), "parts": parts, "runs": reports}, ensure_ascii=False, indent=2))
+        return
+
+    print(f"[BENCH] per message: vapid sign {parts['vapid_sign_ms']}ms, encrypt {parts['encrypt_ms']}ms")
+    for r in reports:
+        print(
+            f"[BENCH] {r['mode']:9s} workers={r['workers']:<3d} "
+            f"{r['per_message_ms']:.3f} ms/msg (cpu {r['cpu_per_message_ms']:.3f}) "
+            f"{r['throughput_per_s']}/s p95={r['p95_ms']}ms new_connections={r['new_connections']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
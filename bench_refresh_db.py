@@ -0,0 +1,316 @@
+"""
+refresh DB 왕복 횟수 / 저장 행 수 벤치마크
+
+알람 1회 처리에 필요한 DB 왕복 횟수와 남는 행 수를 비교한다.
+  - legacy: 알람별 baseline_slots SELECT, 슬롯별 SELECT/INSERT (구독마다 슬롯 복사본)
+  - snapshot: 전체 슬롯 스냅샷 1벌 diff + armed_version (slot_snapshot / slot_meta)
+
+BENCH_DATABASE_URL 이 있으면 실제 Postgres(임시 스키마)를 쓰고,
+없으면 메모리 stand-in 커서로 실행 횟수만 센다.
+
+    python bench_refresh_db.py --alarms 3000
+    BENCH_DATABASE_URL=postgresql://localhost/test python bench_refresh_db.py
+"""
+import argparse
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from alarm_engine import build_slot_index, plan_alerts, make_slot_key
+from alarm_registry import index_alarms
+from slot_store import SlotStore
+import catalog as catalog_module
+from catalog import Catalog
+from alarm_store import load_sent_slots, load_slot_versions, save_slot_diff, save_slot_version, save_sent_slots
+from bench_matching import make_data, make_alarms, match_alarms
+
+
+# =========================
+# 왕복 횟수 카운터
+# =========================
+class CountingCursor:
+    def __init__(self, cur):
+        self.cur = cur
+        self.round_trips = 0
+
+    def execute(self, sql, params=None):
+        self.round_trips += 1
+        return self.cur.execute(sql, params)
+
+    def fetchone(self):
+        return self.cur.fetchone()
+
+    def fetchall(self):
+        return self.cur.fetchall()
+
+
+class StandInCursor:
+    """
+    이 벤치마크가 내는 쿼리만 이해하는 메모리 커서
+    """
+
+    def __init__(self, alarms):
+        self.alarms = {(a["subscription_id"], a["court_group"], a["date"]) for a in alarms}
+        self.baseline = set()
+        self.groups = {}     # court_groups: name → id
+        self.times = {}      # slot_times: time_content → id
+        self.snapshot = {}   # (court_group_id, date, time_id) → first_seen
+        self.version = 0
+        self.sent = set()
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.rows = []
+        group_names = {v: k for k, v in self.groups.items()}
+        time_names = {v: k for k, v in self.times.items()}
+
+        if "UNION ALL" in sql:
+            self.rows = [("g", i, n) for n, i in self.groups.items()] + [("t", i, n) for n, i in self.times.items()]
+        elif "INSERT INTO court_groups" in sql or "INSERT INTO slot_times" in sql:
+            table = self.groups if "court_groups" in sql else self.times
+            for name in params[0]:
+                table.setdefault(name, len(table) + 1)
+            self.rows = [(table[name], name) for name in params[0]]
+        elif "FROM sent_slots" in sql and "JOIN court_groups" in sql:
+            alarm_sids = {a[0] for a in self.alarms}
+            self.rows = [
+                {"subscription_id": s, "court_group": group_names[g], "date": d, "time_content": time_names[t]}
+                for (s, g, d, t) in self.sent if s in alarm_sids
+            ]
+        elif "SELECT version FROM slot_meta" in sql:
+            self.rows = [{"version": self.version}]
+        elif "FROM slot_snapshot" in sql and sql.lstrip().startswith("SELECT"):
+            self.rows = [
+                {"court_group": group_names[g], "date": d, "time_content": time_names[t], "first_seen": v}
+                for (g, d, t), v in self.snapshot.items()
+            ]
+        elif "DELETE FROM slot_snapshot" in sql:
+            for key in zip(*params):
+                self.snapshot.pop(key, None)
+        elif "INSERT INTO slot_snapshot" in sql:
+            version, *cols = params
+            for key in zip(*cols):
+                self.snapshot[key] = version
+        elif "UPDATE slot_meta" in sql:
+            self.version = params[0]
+        elif "INSERT INTO baseline_slots" in sql:
+            self.baseline.add(tuple(params))
+        elif "INSERT INTO sent_slots" in sql and "unnest" in sql:
+            self.sent.update(zip(*params))
+        elif "INSERT INTO sent_slots" in sql:
+            self.sent.add(tuple(params))
+        elif "FROM baseline_slots" in sql:
+            s, g, d = params
+            self.rows = [{"time_content": t} for (s2, g2, d2, t) in self.baseline if (s2, g2, d2) == (s, g, d)]
+        elif "FROM sent_slots" in sql:
+            self.rows = [{"?column?": 1}] if tuple(params) in self.sent else []
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+# =========================
+# 한 사이클 실행
+# =========================
+def cycle_snapshot(cur, slot_index, alarms_by_group, state):
+    versions = load_slot_versions(cur, state.get("versions"))
+    sent = load_sent_slots(cur)
+    version = versions.version + 1
+    alert = versions.version > 0
+    seen_at = version if alert else 0
+
+    groups = {g for g, _ in slot_index} | versions.groups()
+    opened, closed = versions.diff(slot_index, groups)
+    versions.apply(opened, closed, seen_at)
+
+    pending = []
+    if alert:
+        pending = plan_alerts(versions.recent(groups, version), alarms_by_group, sent)
+
+    save_sent_slots(cur, pending, state["catalog"])
+    save_slot_diff(cur, opened, closed, seen_at, state["catalog"])
+    save_slot_version(cur, version)
+    versions.version = version
+    state["versions"] = versions
+    return len(pending)
+
+
+def cycle_legacy(cur, slot_index, alarms, state):
+    # 예전 refresh() 방식: 알람별 SELECT, 슬롯별 SELECT/INSERT
+    matched = match_alarms(alarms, slot_index)
+    fired = 0
+    for (sid, group, date), times in matched.items():
+        cur.execute("""
+            SELECT time_content FROM baseline_slots
+            WHERE subscription_id = %s AND court_group = %s AND date = %s
+        """, (sid, group, date))
+        baseline = {r["time_content"] for r in cur.fetchall()}
+
+        if not baseline:
+            for t in times:
+                cur.execute("""
+                    INSERT INTO baseline_slots (subscription_id, court_group, date, time_content)
+                    VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING
+                """, (sid, group, date, t))
+            continue
+
+        for t in sorted(times - baseline):
+            key = make_slot_key(group, date, t)
+            cur.execute("SELECT 1 FROM sent_slots WHERE subscription_id=%s AND slot_key=%s", (sid, key))
+            if cur.fetchone():
+                continue
+            fired += 1
+            cur.execute("""
+                INSERT INTO baseline_slots (subscription_id, court_group, date, time_content)
+                VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING
+            """, (sid, group, date, t))
+            cur.execute("""
+                INSERT INTO sent_slots (subscription_id, slot_key)
+                VALUES (%s, %s) ON CONFLICT DO NOTHING
+            """, (sid, key))
+    return fired
+
+
+def churn(availability, rate, seed):
+    # 다음 크롤링 결과 흉내: 일부 슬롯을 새로 추가
+    rnd = random.Random(seed)
+    times = [f"{h:02d}:30 ~ {h + 1:02d}:30" for h in range(6, 22)]
+    nxt = {}
+    for cid, days in availability.items():
+        nxt[cid] = {}
+        for date, items in days.items():
+            items = list(items)
+            if rnd.random() < rate:
+                items.append({"timeContent": rnd.choice(times), "resveId": cid})
+            nxt[cid][date] = items
+    return nxt
+
+
+# =========================
+# 실제 Postgres
+# =========================
+def open_pg(url, alarms, legacy):
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(url)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute("CREATE SCHEMA IF NOT EXISTS bench_refresh; SET search_path TO bench_refresh")
+    cur.execute("""
+        DROP TABLE IF EXISTS alarms, baseline_slots, sent_slots, slot_snapshot, slot_meta, court_groups, slot_times
+    """)
+    cur.execute("""
+        CREATE TABLE alarms (subscription_id TEXT, court_group TEXT, date TEXT, armed_version BIGINT DEFAULT 0,
+                             UNIQUE (subscription_id, court_group, date));
+        CREATE TABLE slot_meta (id INT PRIMARY KEY, version BIGINT NOT NULL DEFAULT 0);
+        INSERT INTO slot_meta VALUES (1, 0);
+        CREATE TABLE court_groups (id SERIAL PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+        CREATE TABLE slot_times (id SMALLSERIAL PRIMARY KEY, time_content TEXT NOT NULL UNIQUE);
+    """)
+    if legacy:
+        cur.execute("""
+            CREATE TABLE baseline_slots (subscription_id TEXT, court_group TEXT, date CHAR(8), time_content TEXT,
+                                         UNIQUE (subscription_id, court_group, date, time_content));
+            CREATE TABLE sent_slots (subscription_id TEXT, slot_key TEXT, PRIMARY KEY (subscription_id, slot_key));
+        """)
+    else:
+        # 카탈로그 id 로 저장하는 지금 스키마 (alarms 는 알람 목록을 메모리로 넘기므로 그대로)
+        cur.execute(catalog_module.SENT_SLOTS_TABLE.format(name="sent_slots"))
+        cur.execute(catalog_module.SLOT_SNAPSHOT_TABLE.format(name="slot_snapshot"))
+    for a in alarms:
+        cur.execute("INSERT INTO alarms VALUES (%s, %s, %s) ON CONFLICT DO NOTHING",
+                    (a["subscription_id"], a["court_group"], a["date"]))
+    conn.commit()
+    return conn, cur
+
+
+def use_catalog_db(conn, raw):
+    # Catalog 가 get_db() 로 여는 커넥션 자리에 벤치마크 커넥션 / 커서를 그대로 쓴다
+    @contextmanager
+    def get_db():
+        if conn is None:
+            yield _StandInConn(raw)
+        else:
+            yield conn
+    catalog_module.get_db = get_db
+
+
+class _StandInConn:
+    def __init__(self, cur):
+        self.cur = cur
+
+    @contextmanager
+    def cursor(self):
+        yield self.cur
+
+
+def stored_rows(raw, conn):
+    if conn is None:
+        return {"baseline_slots": len(raw.baseline), "slot_snapshot": len(raw.snapshot)}
+    counts = {}
+    for table in ("baseline_slots", "slot_snapshot"):
+        raw.execute("SELECT to_regclass(%s) IS NOT NULL AS ok", (table,))
+        if not raw.fetchone()["ok"]:
+            counts[table] = 0
+            continue
+        raw.execute(f"SELECT count(*) AS n FROM {table}")
+        counts[table] = raw.fetchone()["n"]
+    return counts
+
+
+def run(mode, cycle_fn, alarm_arg, alarms, slot_indexes, url):
+    conn = None
+    if url:
+        conn, raw = open_pg(url, alarms, cycle_fn is cycle_legacy)
+    else:
+        raw = StandInCursor(alarms)
+    use_catalog_db(conn, raw)
+
+    print(f"[BENCH] {mode}")
+    state = {"catalog": Catalog()}
+    for i, slot_index in enumerate(slot_indexes):
+        cur = CountingCursor(raw)
+        t0 = time.perf_counter()
+        fired = cycle_fn(cur, slot_index, alarm_arg, state)
+        if conn:
+            conn.commit()
+        dt = time.perf_counter() - t0
+        print(f"  cycle {i}: round_trips={cur.round_trips} fired={fired} time={dt * 1000:.1f} ms")
+    print(f"  stored rows: {stored_rows(raw, conn)}")
+
+    if conn:
+        conn.close()
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--alarms", type=int, default=3000)
+    p.add_argument("--groups", type=int, default=20)
+    p.add_argument("--courts", type=int, default=2)
+    p.add_argument("--days", type=int, default=60)
+    p.add_argument("--cycles", type=int, default=3)
+    p.add_argument("--churn", type=float, default=0.05)
+    p.add_argument("--seed", type=int, default=42)
+    args = p.parse_args()
+
+    url = os.environ.get("BENCH_DATABASE_URL")
+    _, availability, court_group_map, dates = make_data(args.groups, args.courts, args.days, 0.4, args.seed)
+    alarms = make_alarms(args.alarms, args.groups, dates, args.seed)
+    alarms_by_group = index_alarms([(a["subscription_id"], a["court_group"], a["date"], 0) for a in alarms])
+
+    slot_indexes = []
+    for i in range(args.cycles):
+        slot_indexes.append(build_slot_index(SlotStore.from_availability(availability), court_group_map))
+        availability = churn(availability, args.churn, args.seed + i)
+
+    print(f"[BENCH] backend={'postgres' if url else 'stand-in'} alarms={len(alarms)} cycles={args.cycles}")
+    run("legacy (per-alarm baseline copies)", cycle_legacy, alarms, alarms, slot_indexes, url)
+    run("snapshot (global slot diff + armed_version)", cycle_snapshot, alarms_by_group, alarms, slot_indexes, url)
+
+
+if __name__ == "__main__":
+    main()
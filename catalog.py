@@ -0,0 +1,267 @@
+import hashlib
+import threading
+
+from db import get_db
+
+# =========================
+# 시설 / 코트그룹 / 시간대 카탈로그
+# =========================
+# 알람 쪽 테이블(alarms / slot_snapshot / sent_slots)은 이름 대신 정수 id 만 저장한다.
+#   court_groups: 코트그룹 이름 → id
+#   facilities:   resveId → 코트그룹 id (+ 제목 / 위치, 목록에서 빠지면 active=false)
+#   slot_times:   timeContent ("06:00 ~ 08:00") → SMALLINT 코드
+# 읽을 때는 JOIN 으로 이름을 돌려받고, 쓸 때만 Catalog 로 이름 → id 를 바꾼다.
+
+# init_db() 를 워커끼리 동시에 돌리지 않도록 잡는 advisory lock 키
+SCHEMA_LOCK_KEY = 482_100_025
+
+# init_db() 의 CREATE TABLE 과 이전 스키마 변환이 같이 쓰는 정의
+SENT_SLOTS_TABLE = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        subscription_id TEXT NOT NULL,
+        court_group_id INT NOT NULL REFERENCES court_groups (id),
+        date CHAR(8) NOT NULL,
+        time_id SMALLINT NOT NULL REFERENCES slot_times (id),
+        sent_at TIMESTAMP DEFAULT NOW(),
+        PRIMARY KEY (subscription_id, court_group_id, date, time_id)
+    );
+"""
+SLOT_SNAPSHOT_TABLE = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        court_group_id INT NOT NULL REFERENCES court_groups (id),
+        date CHAR(8) NOT NULL,
+        time_id SMALLINT NOT NULL REFERENCES slot_times (id),
+        first_seen BIGINT NOT NULL,
+        PRIMARY KEY (court_group_id, date, time_id)
+    );
+"""
+
+
+def facilities_fingerprint(facilities):
+    h = hashlib.sha1()
+    for rid in sorted(facilities):
+        f = facilities[rid]
+        h.update(f"{rid}\0{f.get('title', '')}\0{f.get('location', '')}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+class Catalog:
+    """
+    court_groups / slot_times 의 이름 ↔ id 를 프로세스 메모리에 캐시
+    모르는 이름은 별도 트랜잭션으로 바로 INSERT 한다
+    (차원 데이터라 먼저 commit 돼도 무방하고, 이후 알람 쪽 FK 가 항상 유효)
+    """
+
+    def __init__(self):
+        self.group_ids = {}
+        self.time_ids = {}
+        self.fingerprint = None   # 마지막으로 facilities 에 반영한 시설 목록
+        self._lock = threading.Lock()
+
+    def load(self):
+        with get_db() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT 'g', id, name FROM court_groups
+                    UNION ALL
+                    SELECT 't', id, time_content FROM slot_times
+                """)
+                rows = cur.fetchall()
+
+        with self._lock:
+            for kind, id_, name in rows:
+                (self.group_ids if kind == "g" else self.time_ids)[name] = id_
+
+    def _ensure(self, cache, table, column, names):
+        missing = [n for n in set(names) if n not in cache]
+        if missing:
+            with get_db() as conn:
+                with conn.cursor() as cur:
+                    # DO UPDATE → 이미 있던 행도 RETURNING 으로 id 를 돌려받는다
+                    cur.execute(f"""
+                        INSERT INTO {table} ({column})
+                        SELECT DISTINCT unnest(%s::text[])
+                        ON CONFLICT ({column}) DO UPDATE SET {column} = EXCLUDED.{column}
+                        RETURNING id, {column}
+                    """, (sorted(missing),))
+                    rows = cur.fetchall()
+            with self._lock:
+                for id_, name in rows:
+                    cache[name] = id_
+        return {n: cache[n] for n in names}
+
+    def group_ids_for(self, names):
+        return self._ensure(self.group_ids, "court_groups", "name", names)
+
+    def time_ids_for(self, times):
+        return self._ensure(self.time_ids, "slot_times", "time_content", times)
+
+    # -------------------------
+    # 크롤링에서 본 시설 목록 반영
+    # -------------------------
+    def sync_facilities(self, facilities, court_group_map, complete=True):
+        """
+        시설 목록이 바뀐 경우에만 facilities 를 갱신 (→ 바뀌었으면 True)
+        complete=False(일부 페이지 실패)면 받은 시설만 반영하고 비활성화는 하지 않는다
+        """
+        if not facilities:
+            return False
+        fingerprint = facilities_fingerprint(facilities)
+        if fingerprint == self.fingerprint:
+            return False
+
+        group_ids = self.group_ids_for(court_group_map)
+        rids, gids, titles, locations = [], [], [], []
+        for group, cids in court_group_map.items():
+            for rid in cids:
+                f = facilities.get(rid, {})
+                rids.append(rid)
+                gids.append(group_ids[group])
+                titles.append(f.get("title", ""))
+                locations.append(f.get("location", ""))
+        if not rids:
+            return False
+
+        with get_db() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO facilities (rid, court_group_id, title, location, active, updated_at)
+                    SELECT c.rid, c.gid, c.title, c.location, TRUE, NOW()
+                    FROM unnest(%s::text[], %s::int[], %s::text[], %s::text[]) AS c(rid, gid, title, location)
+                    ON CONFLICT (rid) DO UPDATE SET
+                      court_group_id = EXCLUDED.court_group_id,
+                      title = EXCLUDED.title,
+                      location = EXCLUDED.location,
+                      active = TRUE,
+                      updated_at = NOW()
+                    WHERE (facilities.court_group_id, facilities.title, facilities.location, facilities.active)
+                      IS DISTINCT FROM (EXCLUDED.court_group_id, EXCLUDED.title, EXCLUDED.location, TRUE)
+                """, (rids, gids, titles, locations))
+                # 목록에서 빠진 시설 (전체 목록을 받았을 때만)
+                if complete:
+                    cur.execute("""
+                        UPDATE facilities SET active = FALSE, updated_at = NOW()
+                        WHERE active AND NOT (rid = ANY(%s))
+                    """, (rids,))
+
+        if not complete:
+            # 다음 완전한 목록에서 빠진 시설까지 다시 반영
+            return True
+        self.fingerprint = fingerprint
+        print(f"[INFO] catalog synced: {len(rids)} facilities, {len(group_ids)} court groups")
+        return True
+
+
+# =========================
+# 알람 등록 검증
+# =========================
+def find_court_group(cur, name):
+    """
+    활성 시설이 있는 코트그룹이면 id, 아니면 None
+    카탈로그가 아직 비어 있으면(첫 크롤링 전) 그룹을 만들고 그 id
+    """
+    cur.execute("""
+        SELECT g.id,
+               EXISTS (SELECT 1 FROM facilities f WHERE f.court_group_id = g.id AND f.active)
+        FROM court_groups g WHERE g.name = %s
+    """, (name,))
+    row = cur.fetchone()
+    if row and row[1]:
+        return row[0]
+
+    cur.execute("SELECT EXISTS (SELECT 1 FROM facilities)")
+    if cur.fetchone()[0]:
+        return None
+
+    cur.execute("""
+        INSERT INTO court_groups (name) VALUES (%s)
+        ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
+        RETURNING id
+    """, (name,))
+    return cur.fetchone()[0]
+
+
+# =========================
+# 이전 스키마(이름 / TEXT 키) → 정수 키
+# =========================
+def column_exists(cur, table, column):
+    cur.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    return cur.fetchone() is not None
+
+
+def migrate_catalog(cur):
+    """
+    init_db() 에서 호출. 이미 옮긴 테이블은 건너뛴다.
+    """
+    # alarms.court_group TEXT → court_group_id
+    if column_exists(cur, "alarms", "court_group"):
+        cur.execute("""
+            INSERT INTO court_groups (name)
+            SELECT DISTINCT court_group FROM alarms
+            ON CONFLICT DO NOTHING
+        """)
+        cur.execute("ALTER TABLE alarms ADD COLUMN IF NOT EXISTS court_group_id INT REFERENCES court_groups (id)")
+        cur.execute("""
+            UPDATE alarms a SET court_group_id = g.id
+            FROM court_groups g WHERE g.name = a.court_group
+        """)
+        cur.execute("ALTER TABLE alarms ALTER COLUMN court_group_id SET NOT NULL")
+        # 예전 UNIQUE (subscription_id, court_group, date) 도 같이 사라진다
+        cur.execute("ALTER TABLE alarms DROP COLUMN court_group")
+        cur.execute("""
+            ALTER TABLE alarms ADD CONSTRAINT alarms_subscription_group_date_key
+            UNIQUE (subscription_id, court_group_id, date)
+        """)
+        print("[INFO] migrated alarms.court_group → court_group_id")
+
+    # sent_slots.slot_key "group|date|time" → (court_group_id, date, time_id)
+    if column_exists(cur, "sent_slots", "slot_key"):
+        cur.execute("""
+            INSERT INTO court_groups (name)
+            SELECT DISTINCT split_part(slot_key, '|', 1) FROM sent_slots
+            ON CONFLICT DO NOTHING
+        """)
+        cur.execute("""
+            INSERT INTO slot_times (time_content)
+            SELECT DISTINCT split_part(slot_key, '|', 3) FROM sent_slots
+            ON CONFLICT DO NOTHING
+        """)
+        cur.execute(SENT_SLOTS_TABLE.format(name="sent_slots_new"))
+        cur.execute("""
+            INSERT INTO sent_slots_new (subscription_id, court_group_id, date, time_id, sent_at)
+            SELECT s.subscription_id, g.id, split_part(s.slot_key, '|', 2), t.id, s.sent_at
+            FROM sent_slots s
+            JOIN court_groups g ON g.name = split_part(s.slot_key, '|', 1)
+            JOIN slot_times t ON t.time_content = split_part(s.slot_key, '|', 3)
+            ON CONFLICT DO NOTHING
+        """)
+        cur.execute("DROP TABLE sent_slots")
+        cur.execute("ALTER TABLE sent_slots_new RENAME TO sent_slots")
+        print("[INFO] migrated sent_slots.slot_key → (court_group_id, date, time_id)")
+
+    # slot_snapshot (court_group, time_content) → (court_group_id, time_id)
+    if column_exists(cur, "slot_snapshot", "court_group"):
+        cur.execute("""
+            INSERT INTO court_groups (name)
+            SELECT DISTINCT court_group FROM slot_snapshot
+            ON CONFLICT DO NOTHING
+        """)
+        cur.execute("""
+            INSERT INTO slot_times (time_content)
+            SELECT DISTINCT time_content FROM slot_snapshot
+            ON CONFLICT DO NOTHING
+        """)
+        cur.execute(SLOT_SNAPSHOT_TABLE.format(name="slot_snapshot_new"))
+        cur.execute("""
+            INSERT INTO slot_snapshot_new (court_group_id, date, time_id, first_seen)
+            SELECT g.id, s.date, t.id, s.first_seen
+            FROM slot_snapshot s
+            JOIN court_groups g ON g.name = s.court_group
+            JOIN slot_times t ON t.time_content = s.time_content
+        """)
+        cur.execute("DROP TABLE slot_snapshot")
+        cur.execute("ALTER TABLE slot_snapshot_new RENAME TO slot_snapshot")
+        print("[INFO] migrated slot_snapshot → (court_group_id, date, time_id)")
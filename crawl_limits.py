@@ -0,0 +1,203 @@
+import asyncio
+import os
+import time
+from urllib.parse import urlsplit
+
+# --------------------------------------------------------------
+# 크롤러 부하 제어 설정
+# --------------------------------------------------------------
+CONCURRENCY_INITIAL = int(os.environ.get("CRAWL_CONCURRENCY_INITIAL", "16"))
+CONCURRENCY_MIN = int(os.environ.get("CRAWL_CONCURRENCY_MIN", "2"))
+CONCURRENCY_MAX = int(os.environ.get("CRAWL_CONCURRENCY_MAX", "60"))
+# 응답이 이보다 느리면 서버가 버거워하는 것으로 본다(초)
+TARGET_LATENCY = float(os.environ.get("CRAWL_TARGET_LATENCY", "1.5"))
+# 호스트별 초당 요청 수 상한 / 하한 / 버스트
+# 상한에서 시작해 429/503 이면 절반, 성공마다 +1/s (AIMD) → 평소에는 동시성 제어만 작동
+# (버스트 60 = 예전 커넥터 limit=60 과 같은 순간 동시 요청 수)
+HOST_RATE = float(os.environ.get("CRAWL_HOST_RATE", "1000"))
+HOST_RATE_MIN = float(os.environ.get("CRAWL_HOST_RATE_MIN", "5"))
+HOST_BURST = float(os.environ.get("CRAWL_HOST_BURST", "60"))
+# 크롤링 1회당 최대 요청 수
+REQUEST_BUDGET = int(os.environ.get("CRAWL_REQUEST_BUDGET", "4000"))
+
+# 이 상태코드는 "그만 보내라" 신호
+THROTTLE_STATUS = {429, 502, 503, 504}
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+# --------------------------------------------------------------
+# AIMD 동시성 제어
+#   성공 → limit += 1/limit (RTT 당 +1)
+#   오류/지연 → limit *= 0.5 (RTT 당 최대 1번)
+# --------------------------------------------------------------
+class AdaptiveLimiter:
+    def __init__(self, initial=CONCURRENCY_INITIAL, minimum=CONCURRENCY_MIN,
+                 maximum=CONCURRENCY_MAX, target_latency=TARGET_LATENCY):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.inflight = 0
+        self.decreases = 0
+        self.rtt = target_latency / 2
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            while self.inflight >= int(self.limit):
+                await self._cond.wait()
+            self.inflight += 1
+
+    async def release(self, latency, ok):
+        async with self._cond:
+            self.inflight -= 1
+            now = time.monotonic()
+            # RTT 추정 (EWMA)
+            self.rtt = 0.9 * self.rtt + 0.1 * latency
+
+            if not ok or latency > self.target_latency:
+                if now - self._last_decrease >= self.rtt:
+                    self.limit = max(self.minimum, self.limit * 0.5)
+                    self._last_decrease = now
+                    self.decreases += 1
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+            self._cond.notify_all()
+
+
+# --------------------------------------------------------------
+# 호스트별 토큰 버킷 (속도도 AIMD)
+#   성공 → rate += 1 (상한까지)
+#   429/503 등 → rate *= 0.5 (초당 최대 1번)
+# --------------------------------------------------------------
+class TokenBucket:
+    def __init__(self, rate=HOST_RATE, burst=HOST_BURST, minimum=HOST_RATE_MIN):
+        self.rate = rate
+        self.maximum = rate
+        self.minimum = min(minimum, rate)
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._lock = asyncio.Lock()
+
+    def feedback(self, ok):
+        if ok:
+            self.rate = min(self.maximum, self.rate + 1.0)
+            return
+        now = time.monotonic()
+        if now - self._last_decrease >= 1.0:
+            self.rate = max(self.minimum, self.rate * 0.5)
+            self._last_decrease = now
+            self.decreases += 1
+
+    async def take(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RequestSlot:
+    """
+    limits.request() 안에서 응답을 보고 throttled() 로 실패를 알린다
+    """
+
+    def __init__(self):
+        self.ok = True
+
+    def throttled(self):
+        self.ok = False
+
+
+# --------------------------------------------------------------
+# 크롤링 1회 단위 제어 (동시성 + 호스트별 속도 + 전체 예산)
+# --------------------------------------------------------------
+class CrawlLimits:
+    def __init__(self, budget=REQUEST_BUDGET, rate=HOST_RATE, burst=HOST_BURST, limiter=None):
+        self.budget = budget
+        self.rate = rate
+        self.burst = burst
+        self.limiter = limiter or AdaptiveLimiter()
+        self.buckets = {}
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+
+    def bucket_for(self, url):
+        host = urlsplit(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def request(self, url):
+        return _LimitedRequest(self, url)
+
+    def summary(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "over_budget": self.rejected,
+            "concurrency": round(self.limiter.limit, 1),
+            "decreases": self.limiter.decreases,
+            "host_rate": {h: round(b.rate, 1) for h, b in self.buckets.items()},
+        }
+
+
+class _LimitedRequest:
+    def __init__(self, limits, url):
+        self.limits = limits
+        self.url = url
+        self.slot = RequestSlot()
+        self.started = 0.0
+        self.bucket = None
+
+    async def __aenter__(self):
+        limits = self.limits
+        if limits.requests >= limits.budget:
+            limits.rejected += 1
+            raise BudgetExceeded(f"request budget {limits.budget} exhausted")
+        limits.requests += 1
+
+        self.bucket = limits.bucket_for(self.url)
+        await self.bucket.take()
+        await limits.limiter.acquire()
+        self.started = time.monotonic()
+        return self.slot
+
+    async def __aexit__(self, exc_type, exc, tb):
+        ok = self.slot.ok and exc_type is None
+        if not ok:
+            self.limits.errors += 1
+        self.bucket.feedback(ok)
+        await self.limits.limiter.release(time.monotonic() - self.started, ok)
+        return False
+
+
+def limit_request(limits, url):
+    """
+    limits 가 없으면 제한 없이 통과
+    """
+    if limits is None:
+        return _Unlimited()
+    return limits.request(url)
+
+
+class _Unlimited:
+    async def __aenter__(self):
+        return RequestSlot()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+from metrics import METRICS
+
+# =========================
+# 커넥션 풀 설정
+# =========================
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "5"))
+# 풀에서 꺼낼 때 대기하는 최대 시간(초)
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+# 이 시간(초) 이상 놀던 커넥션은 꺼낼 때 SELECT 1 로 확인
+DB_HEALTHCHECK_IDLE = float(os.environ.get("DB_HEALTHCHECK_IDLE", "30"))
+
+_pool = None
+_pool_pid = None
+_slots = None
+_last_used = {}
+_lock = threading.Lock()
+
+DB_CHECKOUT_SECONDS = METRICS.histogram(
+    "tennis_db_checkout_seconds", "풀에서 커넥션을 받기까지 걸린 시간(초)"
+)
+DB_TRANSACTION_SECONDS = METRICS.histogram(
+    "tennis_db_transaction_seconds", "get_db() 블록(트랜잭션) 소요 시간(초)", ("result",)
+)
+DB_RECONNECTS = METRICS.counter(
+    "tennis_db_reconnects_total", "죽은 커넥션을 버리고 다시 연결한 횟수"
+)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def _get_pool():
+    """
+    프로세스(gunicorn 워커)마다 풀을 하나씩 만든다.
+    fork 전에 만들어진 풀은 부모 것이므로 닫지 않고 버린다.
+    """
+    global _pool, _pool_pid, _slots
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _lock:
+        if _pool is None or _pool_pid != pid:
+            _last_used.clear()
+            _pool = ThreadedConnectionPool(
+                DB_POOL_MIN,
+                DB_POOL_MAX,
+                os.environ["DATABASE_URL"],
+                sslmode="require"
+            )
+            _slots = threading.BoundedSemaphore(DB_POOL_MAX)
+            _pool_pid = pid
+            print(f"[INFO] DB pool created (pid={pid}, min={DB_POOL_MIN}, max={DB_POOL_MAX})")
+
+    return _pool
+
+
+def connect():
+    """
+    풀 밖의 전용 커넥션 (LISTEN 처럼 오래 붙잡고 있는 용도)
+    """
+    return psycopg2.connect(os.environ["DATABASE_URL"], sslmode="require")
+
+
+def _is_healthy(conn):
+    if conn.closed:
+        return False
+
+    # 방금 만든 커넥션이거나 최근에 쓴 커넥션은 그대로 사용
+    last = _last_used.get(id(conn))
+    if last is None or time.monotonic() - last < DB_HEALTHCHECK_IDLE:
+        return True
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+
+
+def checkout():
+    pool = _get_pool()
+    slots = _slots
+    if not slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise PoolTimeout(f"no DB connection available in {DB_POOL_TIMEOUT}s")
+
+    try:
+        # 죽은 커넥션은 버리고 다시 꺼낸다
+        for _ in range(DB_POOL_MAX + 1):
+            conn = pool.getconn()
+            if _is_healthy(conn):
+                return conn
+            print("[WARN] DB connection unhealthy, reconnecting")
+            DB_RECONNECTS.inc()
+            _last_used.pop(id(conn), None)
+            pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("could not get a healthy DB connection")
+    except Exception:
+        slots.release()
+        raise
+
+
+def checkin(conn):
+    pool = _get_pool()
+    broken = conn.closed or conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN
+    if broken:
+        _last_used.pop(id(conn), None)
+    else:
+        _last_used[id(conn)] = time.monotonic()
+    pool.putconn(conn, close=broken)
+    _slots.release()
+
+
+@contextmanager
+def get_db():
+    """
+    풀에서 커넥션을 빌려준다.
+    정상 종료 시 commit, 예외 시 rollback 후 풀에 반납.
+    """
+    t0 = time.perf_counter()
+    conn = checkout()
+    started = time.perf_counter()
+    DB_CHECKOUT_SECONDS.observe(started - t0)
+    result = "error"
+    try:
+        yield conn
+        conn.commit()
+        result = "ok"
+    except Exception:
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+        raise
+    finally:
+        checkin(conn)
+        DB_TRANSACTION_SECONDS.observe(time.perf_counter() - started, result=result)
@@ -0,0 +1,171 @@
+import os
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
+# 사용할 파서: lxml(기본) / selectolax / bs4
+FACILITY_PARSER = os.environ.get("FACILITY_PARSER", "lxml")
+
+RESVE_ID_RE = re.compile(r"resveId=(\d+)")
+ITEM_SELECTOR = "li.reserve_box_item"
+LINK_SELECTOR = "div.btn_wrap a[href*='selectFcltyRceptResveViewU.do']"
+
+
+# --------------------------------------------------------------
+# BeautifulSoup (html.parser) - 기존 구현
+# --------------------------------------------------------------
+def parse_bs4(html):
+    soup = BeautifulSoup(html, "html.parser")
+    items = soup.select(ITEM_SELECTOR)
+    results = {}
+
+    for li in items:
+        a = li.select_one(LINK_SELECTOR)
+        if not a:
+            continue
+
+        href = a.get("href", "")
+        m = RESVE_ID_RE.search(href)
+        if not m:
+            continue
+
+        rid = m.group(1)
+        title_div = li.select_one("div.reserve_title")
+        if not title_div:
+            continue
+        pos_div = title_div.select_one("div.reserve_position")
+
+        location = pos_div.get_text(strip=True) if pos_div else ""
+        if pos_div:
+            pos_div.extract()
+
+        title = title_div.get_text(strip=True)
+
+        results[rid] = {"title": title, "location": location}
+
+    return results
+
+
+# --------------------------------------------------------------
+# lxml XPath
+# --------------------------------------------------------------
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+if lxml_html is not None:
+    XP_ITEMS = etree.XPath(f"//li[{_has_class('reserve_box_item')}]")
+    XP_LINK = etree.XPath(
+        f".//div[{_has_class('btn_wrap')}]//a[contains(@href, 'selectFcltyRceptResveViewU.do')]"
+    )
+    XP_TITLE = etree.XPath(f".//div[{_has_class('reserve_title')}]")
+    XP_POS = etree.XPath(f".//div[{_has_class('reserve_position')}]")
+    XP_TEXT = etree.XPath(".//text()")
+
+
+def _lxml_text(el):
+    # bs4 get_text(strip=True) 와 동일: 텍스트 노드별 strip 후 이어붙임
+    return "".join(s.strip() for s in XP_TEXT(el))
+
+
+def parse_lxml(html):
+    if not html or not html.strip():
+        return {}
+
+    root = lxml_html.fromstring(html)
+    results = {}
+
+    for li in XP_ITEMS(root):
+        links = XP_LINK(li)
+        if not links:
+            continue
+
+        m = RESVE_ID_RE.search(links[0].get("href", ""))
+        if not m:
+            continue
+
+        rid = m.group(1)
+        titles = XP_TITLE(li)
+        if not titles:
+            continue
+        title_div = titles[0]
+        positions = XP_POS(title_div)
+        pos_div = positions[0] if positions else None
+
+        location = _lxml_text(pos_div) if pos_div is not None else ""
+        if pos_div is not None:
+            # extract() 와 같이 tail 텍스트는 남긴다
+            pos_div.drop_tree()
+
+        title = _lxml_text(title_div)
+
+        results[rid] = {"title": title, "location": location}
+
+    return results
+
+
+# --------------------------------------------------------------
+# selectolax (설치된 경우만)
+# --------------------------------------------------------------
+def parse_selectolax(html):
+    tree = HTMLParser(html)
+    results = {}
+
+    for li in tree.css(ITEM_SELECTOR):
+        a = li.css_first(LINK_SELECTOR)
+        if a is None:
+            continue
+
+        m = RESVE_ID_RE.search(a.attributes.get("href") or "")
+        if not m:
+            continue
+
+        rid = m.group(1)
+        title_div = li.css_first("div.reserve_title")
+        if title_div is None:
+            continue
+        pos_div = title_div.css_first("div.reserve_position")
+
+        location = pos_div.text(deep=True, separator="", strip=True) if pos_div is not None else ""
+        if pos_div is not None:
+            pos_div.decompose()
+
+        title = title_div.text(deep=True, separator="", strip=True)
+
+        results[rid] = {"title": title, "location": location}
+
+    return results
+
+
+PARSERS = {"bs4": parse_bs4}
+if lxml_html is not None:
+    PARSERS["lxml"] = parse_lxml
+if HTMLParser is not None:
+    PARSERS["selectolax"] = parse_selectolax
+
+
+def get_parser(name=None):
+    name = name or FACILITY_PARSER
+    parser = PARSERS.get(name)
+    if parser is None:
+        print(f"[WARN] facility parser '{name}' not available, using bs4")
+        return parse_bs4
+    return parser
+
+
+def parse_facility_html(html, backend=None):
+    """
+    시설 목록 HTML → {rid: {"title", "location"}}
+    """
+    return get_parser(backend)(html)
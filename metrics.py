@@ -0,0 +1,262 @@
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from procutil import app_path, write_json_atomic
+
+# =========================
+# 메트릭 설정
+# =========================
+# 워커 프로세스별 메트릭 파일 디렉터리 (/metrics 에서 합산)
+METRICS_DIR = os.environ.get("METRICS_DIR", app_path("metrics"))
+
+# 초 단위 히스토그램 기본 구간
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _series(name, labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return name
+    return name + "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# =========================
+# 메트릭 타입
+# =========================
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _copy(self, value):
+        return value
+
+    def dump(self):
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "help": self.documentation,
+                "labels": list(self.labelnames),
+                "values": [[list(k), self._copy(v)] for k, v in self._values.items()],
+            }
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    값과 기록 시각을 같이 저장 → 여러 워커 중 가장 최근 값을 사용
+    """
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = [value, time.time()]
+
+    def _copy(self, value):
+        return list(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][i] += 1
+                    break
+            entry["sum"] += value
+            entry["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def _copy(self, value):
+        return dict(value, buckets=list(value["buckets"]))
+
+    def dump(self):
+        data = super().dump()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+# =========================
+# 레지스트리 (워커별 파일 → 합산)
+# =========================
+class Registry:
+    def __init__(self, directory=METRICS_DIR):
+        self.directory = directory
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def dump(self):
+        return {name: m.dump() for name, m in list(self._metrics.items())}
+
+    # -------------------------
+    # 워커 간 공유
+    # -------------------------
+    def flush(self):
+        """
+        이 프로세스의 메트릭을 {pid}.json 으로 저장 (임시파일 → rename)
+        """
+        try:
+            write_json_atomic(os.path.join(self.directory, f"{os.getpid()}.json"), self.dump(), ensure_ascii=False)
+        except Exception as e:
+            print("[WARN] metrics flush failed:", e)
+
+    def collect(self):
+        """
+        모든 워커 파일 합산
+          counter / histogram: 더하기, gauge: 가장 최근 값
+        """
+        self.flush()
+        merged = {}
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+            for name, m in data.items():
+                target = merged.setdefault(name, dict(m, values={}))
+                values = target["values"]
+                for key, v in m["values"]:
+                    key = tuple(key)
+                    prev = values.get(key)
+                    if prev is None:
+                        values[key] = v
+                    elif m["kind"] == "counter":
+                        values[key] = prev + v
+                    elif m["kind"] == "gauge":
+                        values[key] = v if v[1] > prev[1] else prev
+                    elif m["kind"] == "histogram" and len(v["buckets"]) == len(prev["buckets"]):
+                        values[key] = {
+                            "buckets": [a + b for a, b in zip(prev["buckets"], v["buckets"])],
+                            "sum": prev["sum"] + v["sum"],
+                            "count": prev["count"] + v["count"],
+                        }
+        return merged
+
+    def render(self):
+        """
+        Prometheus text format (0.0.4)
+        """
+        lines = []
+        for name, m in sorted(self.collect().items()):
+            labelnames = m["labels"]
+            lines.append(f"# HELP {name} {m['help']}")
+            lines.append(f"# TYPE {name} {m['kind']}")
+
+            for key, v in sorted(m["values"].items()):
+                if m["kind"] == "counter":
+                    lines.append(f"{_series(name, labelnames, key)} {_fmt(v)}")
+                elif m["kind"] == "gauge":
+                    lines.append(f"{_series(name, labelnames, key)} {_fmt(v[0])}")
+                else:
+                    cumulative = 0
+                    for bound, n in zip(m["buckets"], v["buckets"]):
+                        cumulative += n
+                        lines.append(f"{_series(name + '_bucket', labelnames, key, ('le', _fmt(bound)))} {cumulative}")
+                    lines.append(f"{_series(name + '_bucket', labelnames, key, ('le', '+Inf'))} {v['count']}")
+                    lines.append(f"{_series(name + '_sum', labelnames, key)} {_fmt(round(v['sum'], 6))}")
+                    lines.append(f"{_series(name + '_count', labelnames, key)} {v['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    # -------------------------
+    # 사이클 요약용
+    # -------------------------
+    def sample(self):
+        """
+        이 프로세스의 counter / histogram 현재 값 → {series: value}
+        """
+        out = {}
+        for name, m in list(self._metrics.items()):
+            if m.kind == "gauge":
+                continue
+            for key, v in m.dump()["values"]:
+                if m.kind == "counter":
+                    out[_series(name, m.labelnames, key)] = v
+                else:
+                    out[_series(name + "_count", m.labelnames, key)] = v["count"]
+                    out[_series(name + "_sum", m.labelnames, key)] = v["sum"]
+        return out
+
+    def delta(self, before):
+        """
+        sample() 이후 늘어난 값만
+        """
+        out = {}
+        for series, value in self.sample().items():
+            d = value - before.get(series, 0)
+            if d:
+                out[series] = round(d, 4) if isinstance(d, float) else d
+        return out
+
+
+METRICS = Registry()
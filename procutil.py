@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+import threading
+
+
+# =========================
+# 워커 간 공유 파일
+# =========================
+# 앱 사용자만 쓰는 디렉터리 (0700)
+# 공용 /tmp 에 고정 이름으로 두면 다른 로컬 사용자가 파일을 미리 만들어
+# 내용을 바꿔치기하거나 (시설 캐시 / 스냅샷) lock 을 못 열게 막을 수 있다
+APP_DIR = os.environ.get(
+    "TENNIS_APP_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "tennis")
+)
+
+
+def app_path(name):
+    return os.path.join(APP_DIR, name)
+
+
+def ensure_dir(d):
+    os.makedirs(d or ".", mode=0o700, exist_ok=True)
+
+
+def write_json_atomic(path, data, **dump_kwargs):
+    """
+    같은 디렉터리의 임시파일에 쓰고 rename → 다른 워커는 완성된 파일만 본다
+    실패하면 임시파일을 지우고 예외를 그대로 올린다
+    """
+    d = os.path.dirname(path) or "."
+    ensure_dir(d)
+    fd, tmp = tempfile.mkstemp(dir=d, prefix="." + os.path.basename(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_json(path, label):
+    """
+    없으면 None, 깨졌으면 경고 후 None
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[WARN] {label} load failed:", e)
+        return None
+
+
+# =========================
+# 프로세스당 백그라운드 스레드 1개
+# =========================
+class ProcessThread:
+    """
+    gunicorn fork 이후 워커마다 데몬 스레드 1개
+    (fork 로 복사된 부모의 스레드 객체는 이 프로세스에서 돌지 않으므로 다시 띄운다)
+
+    before_start: 이 프로세스에서 처음 띄우기 직전에 lock 안에서 호출
+    """
+
+    def __init__(self, target, name, before_start=None):
+        self.target = target
+        self.name = name
+        self.before_start = before_start
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        """
+        → 이번 호출에서 새로 띄웠으면 True
+        """
+        if self._thread is not None and self._pid == os.getpid():
+            return False
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return False
+            self._pid = os.getpid()
+            if self.before_start:
+                self.before_start()
+            self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+            self._thread.start()
+            return True
@@ -0,0 +1,181 @@
+import base64
+import hashlib
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from metrics import METRICS
+
+# =========================
+# 발송 설정
+# =========================
+PUSH_WORKERS = int(os.environ.get("PUSH_WORKERS", "16"))
+# push 서비스 1건당 타임아웃(초)
+PUSH_TIMEOUT = float(os.environ.get("PUSH_TIMEOUT", "10"))
+# 일시적 오류(429/5xx/네트워크) 재시도
+PUSH_RETRIES = int(os.environ.get("PUSH_RETRIES", "2"))
+PUSH_BACKOFF = float(os.environ.get("PUSH_BACKOFF", "0.5"))
+PUSH_BACKOFF_MAX = float(os.environ.get("PUSH_BACKOFF_MAX", "5"))
+# push 서비스가 메시지를 보관하는 시간(초) / 긴급도 (very-low | low | normal | high)
+PUSH_TTL = int(os.environ.get("PUSH_TTL", "900"))
+PUSH_URGENCY = os.environ.get("PUSH_URGENCY", "high")
+
+# 오류 분류
+OK = "ok"
+PERMANENT = "permanent"   # 404/410 → 구독 만료, 삭제 대상
+TRANSIENT = "transient"   # 429/5xx/타임아웃 → 재시도
+PAYLOAD = "payload"       # 400/413 등 → 재시도해도 소용없음
+
+# slots: [(subscription_id, court_group, date, time), ...] → 성공 시 sent_slots 기록용
+# data: payload 에 같이 넣을 값 (tag / url / 슬롯 목록), topic: 같은 topic 의 미전달 메시지는 새 것으로 대체
+PushJob = namedtuple("PushJob", ["subscription_id", "subscription", "title", "body", "slots", "data", "topic"])
+PushResult = namedtuple("PushResult", ["job", "ok", "error", "latency", "kind", "attempts"])
+
+PUSH_RESULTS = METRICS.counter(
+    "tennis_push_results_total", "push 발송 결과 (ok / permanent / transient / payload)", ("result",)
+)
+PUSH_SECONDS = METRICS.histogram(
+    "tennis_push_seconds", "push 1건 발송 시간(재시도 포함, 초)"
+)
+PUSH_RETRIES_TOTAL = METRICS.counter(
+    "tennis_push_retries_total", "일시적 오류로 다시 보낸 횟수"
+)
+
+
+def make_topic(*parts):
+    """
+    Web Push Topic 헤더 값 (URL-safe base64 32자 이하)
+    """
+    digest = hashlib.sha256("|".join(map(str, parts)).encode("utf-8")).digest()[:24]
+    return base64.urlsafe_b64encode(digest).decode("ascii")
+
+
+def response_status(error):
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def classify_error(error):
+    status = response_status(error)
+    if status is None:
+        # 응답 없이 실패 (타임아웃, 연결 오류 등)
+        return TRANSIENT
+    if status in (404, 410):
+        return PERMANENT
+    if status == 429 or status >= 500:
+        return TRANSIENT
+    return PAYLOAD
+
+
+def retry_delay(error, attempt):
+    """
+    Retry-After 헤더가 있으면 따르고, 없으면 지수 백오프
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    retry_after = headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(PUSH_BACKOFF_MAX, float(retry_after))
+        except ValueError:
+            pass
+    return min(PUSH_BACKOFF_MAX, PUSH_BACKOFF * (2 ** attempt))
+
+
+# =========================
+# 병렬 발송
+# =========================
+def deliver_all(jobs, send, workers=PUSH_WORKERS, timeout=PUSH_TIMEOUT):
+    """
+    jobs 를 큐에 넣고 최대 workers 개 스레드가 동시에 발송한다.
+    send(subscription, title, body, timeout=..., data=..., topic=...) 가 예외 없이 끝나면 성공.
+
+    → (results, stats)
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return [], summarize([], 0.0)
+
+    q = queue.Queue()
+    for job in jobs:
+        q.put(job)
+
+    results = []
+    results_lock = threading.Lock()
+
+    def worker():
+        while True:
+            try:
+                job = q.get_nowait()
+            except queue.Empty:
+                return
+
+            res = deliver_one(job, send, timeout)
+            PUSH_RESULTS.inc(result=res.kind)
+            PUSH_SECONDS.observe(res.latency)
+            if res.attempts > 1:
+                PUSH_RETRIES_TOTAL.inc(res.attempts - 1)
+
+            with results_lock:
+                results.append(res)
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=worker, name=f"push-{i}", daemon=True)
+        for i in range(min(workers, len(jobs)))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return results, summarize(results, time.perf_counter() - started)
+
+
+def deliver_one(job, send, timeout):
+    """
+    한 건 발송. 예외는 여기서 분류해서 결과로 돌려준다.
+    (한 엔드포인트 실패가 배치 전체를 멈추지 않도록)
+    """
+    t0 = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            send(job.subscription, job.title, job.body, timeout=timeout, data=job.data, topic=job.topic)
+            return PushResult(job, True, None, time.perf_counter() - t0, OK, attempt)
+        except Exception as e:
+            kind = classify_error(e)
+            if kind != TRANSIENT or attempt > PUSH_RETRIES:
+                return PushResult(job, False, e, time.perf_counter() - t0, kind, attempt)
+            time.sleep(retry_delay(e, attempt - 1))
+
+
+# =========================
+# 배치 통계
+# =========================
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def summarize(results, elapsed):
+    latencies = sorted(r.latency for r in results)
+    ok = sum(1 for r in results if r.ok)
+    return {
+        "total": len(results),
+        "ok": ok,
+        "failed": len(results) - ok,
+        "permanent": sum(1 for r in results if r.kind == PERMANENT),
+        "transient": sum(1 for r in results if r.kind == TRANSIENT),
+        "payload": sum(1 for r in results if r.kind == PAYLOAD),
+        "retries": sum(r.attempts - 1 for r in results),
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "throughput_per_s": round(len(results) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
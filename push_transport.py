@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from py_vapid import Vapid
+from pywebpush import WebPusher, WebPushException
+
+from metrics import METRICS
+from push_delivery import PUSH_WORKERS
+
+# =========================
+# push 전송 설정
+# =========================
+# VAPID JWT 유효 시간(초, 최대 24시간) / 만료 이만큼 전에 새로 서명
+VAPID_EXP_SECONDS = int(os.environ.get("VAPID_EXP_SECONDS", str(12 * 60 * 60)))
+VAPID_REFRESH_MARGIN = int(os.environ.get("VAPID_REFRESH_MARGIN", "600"))
+# push 서비스 호스트별 keep-alive 커넥션 수 (발송 스레드 수만큼)
+PUSH_POOL_SIZE = int(os.environ.get("PUSH_POOL_SIZE", str(PUSH_WORKERS)))
+
+VAPID_SIGNS = METRICS.counter(
+    "tennis_push_vapid_signs_total", "VAPID 헤더를 새로 서명한 횟수 (audience 별 캐시 미스)"
+)
+PUSH_SESSIONS = METRICS.counter(
+    "tennis_push_sessions_total", "push 서비스 호스트별로 만든 HTTP 세션 수"
+)
+
+
+def audience(endpoint):
+    # VAPID aud = push 서비스 origin
+    url = urlparse(endpoint)
+    return f"{url.scheme}://{url.netloc}"
+
+
+# =========================
+# 재사용 push 전송
+# =========================
+class PushTransport:
+    """
+    webpush() 를 건마다 부르면 VAPID 키 파싱 + JWT 서명(ECDSA) + 새 커넥션을 매번 한다.
+
+    - VAPID 헤더: audience(push 서비스 origin)별로 서명해 두고 만료 직전까지 재사용
+    - HTTP: push 서비스 호스트별 requests.Session (keep-alive 커넥션 풀)
+    페이로드 암호화는 구독마다 다르므로 건마다 한다 (WebPusher).
+    """
+
+    def __init__(self, claims_sub, exp_seconds=VAPID_EXP_SECONDS,
+                 refresh_margin=VAPID_REFRESH_MARGIN, pool_size=PUSH_POOL_SIZE):
+        self.claims_sub = claims_sub
+        self.exp_seconds = exp_seconds
+        self.refresh_margin = refresh_margin
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._vapid = {}     # private key 문자열 → Vapid
+        self._headers = {}   # (private key, aud) → (headers, exp)
+        self._sessions = {}  # origin → requests.Session
+
+    def _check_pid(self):
+        # fork 된 워커는 부모의 커넥션을 쓰지 않는다
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._sessions = {}
+                    self._pid = os.getpid()
+
+    def vapid_headers(self, private_key, endpoint):
+        aud = audience(endpoint)
+        key = (private_key, aud)
+        now = time.time()
+
+        cached = self._headers.get(key)
+        if cached is not None and cached[1] - self.refresh_margin > now:
+            return cached[0]
+
+        with self._lock:
+            cached = self._headers.get(key)
+            if cached is not None and cached[1] - self.refresh_margin > now:
+                return cached[0]
+
+            vapid = self._vapid.get(private_key)
+            if vapid is None:
+                vapid = self._vapid[private_key] = Vapid.from_string(private_key=private_key)
+
+            exp = int(now) + self.exp_seconds
+            headers = vapid.sign({"sub": self.claims_sub, "aud": aud, "exp": exp})
+            self._headers[key] = (headers, exp)
+            VAPID_SIGNS.inc()
+            return headers
+
+    def session(self, endpoint):
+        self._check_pid()
+        origin = audience(endpoint)
+        s = self._sessions.get(origin)
+        if s is not None:
+            return s
+
+        with self._lock:
+            s = self._sessions.get(origin)
+            if s is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                self._sessions[origin] = s
+                PUSH_SESSIONS.inc()
+            return s
+
+    def send(self, subscription, data, private_key, headers=None, ttl=0, timeout=None):
+        """
+        webpush() 와 같은 규칙: 202 초과 응답은 WebPushException(response=...)
+        """
+        endpoint = subscription["endpoint"]
+        h = dict(headers or {})
+        h.update(self.vapid_headers(private_key, endpoint))
+
+        response = WebPusher(subscription, requests_session=self.session(endpoint)).send(
+            data, h, ttl=ttl, timeout=timeout
+        )
+        if response.status_code > 202:
+            raise WebPushException(
+                f"Push failed: {response.status_code} {response.reason}\nResponse body:{response.text}",
+                response=response,
+            )
+        return response
@@ -0,0 +1,336 @@
+"""
+크롤링 대상 사이트 재생 서버 (오프라인 실행 / 벤치마크용)
+
+fixtures/ 의 시설 목록 페이지와 resveTmList 응답을 로컬에서 재생한다.
+  - 응답 지연 / 오류율(503) / throttle(429) 설정
+  - 사이클마다 슬롯 변동(churn): POST /_replay/cycle 로 다음 사이클
+  - POST /push/<id>: 가짜 Web Push 엔드포인트 (201 / 410)
+
+    python replay_server.py --port 8800 --facilities 200 --latency 50 --error-rate 0.01
+    CRAWL_SITE_ROOT=http://127.0.0.1:8800 gunicorn app:app
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+from collections import Counter
+
+from aiohttp import web
+
+from facility_parser import parse_bs4
+from tennis_core import LIST_PATH, TIMES_PATH
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGE_UNIT = 20
+
+ITEM_RE = re.compile(r'<li class="reserve_box_item">.*?<div class="btn_wrap">.*?</div>\s*</li>', re.S)
+PAGING_RE = re.compile(r'<div class="paging">.*?</div>', re.S)
+GROUP_RE = re.compile(r"^(\[.*?\])?(.*?)테니스장")
+
+
+# =========================
+# 녹화된 응답 로드
+# =========================
+def load_fixture_pages():
+    pages = []
+    index = 1
+    while True:
+        path = os.path.join(FIXTURE_DIR, f"facility_list_page{index}.html")
+        if not os.path.exists(path):
+            return pages
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append(f.read())
+        index += 1
+
+
+def load_fixture_times():
+    with open(os.path.join(FIXTURE_DIR, "resve_tm_list.json"), "r", encoding="utf-8") as f:
+        return json.load(f)["resveTmList"]
+
+
+class FacilityPages:
+    """
+    facilities 가 None 이면 녹화된 페이지 그대로,
+    숫자면 녹화된 항목 하나를 틀로 써서 그 수만큼 만든다.
+    """
+
+    def __init__(self, facilities=None, courts=2):
+        recorded = load_fixture_pages()
+        if not recorded:
+            raise RuntimeError(f"no facility_list_page*.html in {FIXTURE_DIR}")
+
+        if facilities is None:
+            self.pages = recorded
+            self.facilities = {}
+            for html in recorded:
+                self.facilities.update(parse_bs4(html))
+            return
+
+        first = recorded[0]
+        items = list(ITEM_RE.finditer(first))
+        item = items[0].group(0)
+        rid, info = next(iter(parse_bs4(first).items()))
+        alt = GROUP_RE.match(info["title"]).group(2) + "테니스장"
+        self.item = (
+            item.replace(info["title"], "{title}")
+                .replace(info["location"], "{location}")
+                .replace(f'alt="{alt}"', 'alt="{alt}"')
+                .replace(rid, "{rid}")
+        )
+        self.head = first[:items[0].start()]
+        self.tail = first[items[-1].end():]
+
+        # 녹화된 그룹 이름을 돌려 쓰고, 모자라면 번호를 붙인다
+        recorded_facilities = {}
+        for html in recorded:
+            recorded_facilities.update(parse_bs4(html))
+        names = []
+        for f in recorded_facilities.values():
+            name = GROUP_RE.match(f["title"]).group(2).strip()
+            if name not in names:
+                names.append(name)
+        locations = [f["location"] for f in recorded_facilities.values()]
+
+        self.facilities = {}
+        for i in range(facilities):
+            g = i // courts
+            group = names[g % len(names)] + (str(g // len(names) + 1) if g >= len(names) else "")
+            rid = str(10301 + i)
+            self.facilities[rid] = {
+                "title": f"[{'유료' if g % 2 == 0 else '무료'}]{group}테니스장 {i % courts + 1}번코트",
+                "location": locations[i % len(locations)],
+            }
+
+        rids = list(self.facilities)
+        n_pages = max(1, -(-len(rids) // PAGE_UNIT))
+        self.pages = [
+            self.render_page(rids[p * PAGE_UNIT:(p + 1) * PAGE_UNIT], p + 1, n_pages)
+            for p in range(n_pages)
+        ]
+
+    def render_page(self, rids, page, n_pages):
+        items = []
+        for rid in rids:
+            f = self.facilities[rid]
+            items.append(self.item.format(
+                rid=rid,
+                title=f["title"],
+                location=f["location"],
+                alt=GROUP_RE.match(f["title"]).group(2) + "테니스장",
+            ))
+        links = []
+        for i in range(1, n_pages + 1):
+            on = ' class="on"' if i == page else ""
+            links.append(
+                f'<a href="?searchFcltyFieldNm=ITEM_01&amp;pageUnit={PAGE_UNIT}&amp;pageIndex={i}'
+                f'&amp;checkSearchMonthNow=false"{on}>{i}</a>'
+            )
+        paging = '<div class="paging">\n      ' + " ".join(links) + "\n    </div>"
+        return PAGING_RE.sub(paging, self.head + "\n        ".join(items) + self.tail)
+
+    def page(self, index):
+        if 1 <= index <= len(self.pages):
+            return self.pages[index - 1]
+        return self.pages[0]
+
+
+# =========================
+# 재생 서버
+# =========================
+class ReplayServer:
+    def __init__(self, facilities=None, courts=2, fill=0.4, churn=0.05,
+                 latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0,
+                 push_latency=0.0, push_gone_rate=0.0, seed=42):
+        self.listing = FacilityPages(facilities, courts)
+        self.times = load_fixture_times()
+        self.fill = fill
+        self.churn = churn
+        # 지연은 ms 단위로 받는다
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.push_latency = push_latency / 1000
+        self.push_gone_rate = push_gone_rate
+        self.seed = seed
+
+        self.cycle = 0
+        self.stats = Counter()
+        self.gone = set()
+        # push 요청을 보낸 (ip, port) → 새 커넥션 수 확인용
+        self.push_peers = set()
+        self._slots = {}
+        self._rnd = random.Random(seed)
+        self._loop = None
+        self._runner = None
+        self.url = None
+
+    @property
+    def facilities(self):
+        return self.listing.facilities
+
+    # -------------------------
+    # 슬롯 상태 (사이클마다 churn 만큼 뒤집기)
+    # -------------------------
+    def slots_for(self, rid, date):
+        if rid not in self.facilities:
+            return []
+
+        key = (rid, date)
+        state = self._slots.get(key)
+        if state is None:
+            rnd = random.Random(f"{self.seed}|{rid}|{date}")
+            state = (0, {i for i in range(len(self.times)) if rnd.random() < self.fill})
+
+        cycle, available = state
+        while cycle < self.cycle:
+            cycle += 1
+            rnd = random.Random(f"{self.seed}|{rid}|{date}|{cycle}")
+            for i in range(len(self.times)):
+                if rnd.random() < self.churn:
+                    available ^= {i}
+        self._slots[key] = (cycle, available)
+
+        return [dict(self.times[i], resveId=rid) for i in sorted(available)]
+
+    def advance(self):
+        self.cycle += 1
+        return self.cycle
+
+    # -------------------------
+    # 핸들러
+    # -------------------------
+    async def delay(self):
+        d = self.latency + self._rnd.uniform(-self.jitter, self.jitter)
+        if d > 0:
+            await asyncio.sleep(d)
+
+    def failure(self, endpoint):
+        r = self._rnd.random()
+        if r < self.error_rate:
+            self.stats[f"{endpoint}_503"] += 1
+            return web.Response(status=503)
+        if r < self.error_rate + self.throttle_rate:
+            self.stats[f"{endpoint}_429"] += 1
+            return web.Response(status=429)
+        return None
+
+    async def handle_list(self, request):
+        await self.delay()
+        failed = self.failure("list")
+        if failed is not None:
+            return failed
+
+        self.stats["list"] += 1
+        try:
+            index = int(request.query.get("pageIndex", "1"))
+        except ValueError:
+            index = 1
+        resp = web.Response(text=self.listing.page(index), content_type="text/html")
+        resp.set_cookie("JSESSIONID", f"replay{self.cycle}")
+        return resp
+
+    async def handle_times(self, request):
+        await self.delay()
+        failed = self.failure("times")
+        if failed is not None:
+            return failed
+
+        self.stats["times"] += 1
+        form = await request.post()
+        slots = self.slots_for(form.get("resveId", ""), form.get("dateVal", ""))
+        return web.json_response({"resveTmList": slots})
+
+    async def handle_push(self, request):
+        await request.read()
+        if request.transport is not None:
+            self.push_peers.add(request.transport.get_extra_info("peername"))
+        if self.push_latency:
+            await asyncio.sleep(self.push_latency)
+
+        sid = request.match_info["sid"]
+        if sid in self.gone or self._rnd.random() < self.push_gone_rate:
+            self.gone.add(sid)
+            self.stats["push_410"] += 1
+            return web.Response(status=410)
+        self.stats["push"] += 1
+        if request.headers.get("Topic"):
+            self.stats["push_topic"] += 1
+        self.stats[f"push_urgency_{request.headers.get('Urgency', 'none')}"] += 1
+        return web.Response(status=201)
+
+    async def handle_cycle(self, request):
+        return web.json_response({"cycle": self.advance()})
+
+    async def handle_stats(self, request):
+        return web.json_response({"cycle": self.cycle, "push_connections": len(self.push_peers), **self.stats})
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get(LIST_PATH, self.handle_list)
+        app.router.add_post(TIMES_PATH, self.handle_times)
+        app.router.add_post("/push/{sid}", self.handle_push)
+        app.router.add_post("/_replay/cycle", self.handle_cycle)
+        app.router.add_get("/_replay/stats", self.handle_stats)
+        return app
+
+    # -------------------------
+    # 같은 프로세스에서 백그라운드로 (벤치마크용)
+    # -------------------------
+    def start(self, host="127.0.0.1", port=0):
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(self.make_app(), access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, host, port)
+            self._loop.run_until_complete(site.start())
+            bound = site._server.sockets[0].getsockname()[1]
+            self.url = f"http://{host}:{bound}"
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name="replay-server", daemon=True).start()
+        ready.wait()
+        return self.url
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8800)
+    p.add_argument("--facilities", type=int, default=None, help="없으면 녹화된 목록 그대로")
+    p.add_argument("--courts", type=int, default=2, help="그룹당 코트 수 (--facilities 와 같이)")
+    p.add_argument("--fill", type=float, default=0.4)
+    p.add_argument("--churn", type=float, default=0.05)
+    p.add_argument("--latency", type=float, default=0.0, help="ms")
+    p.add_argument("--jitter", type=float, default=0.0, help="ms")
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--throttle-rate", type=float, default=0.0)
+    p.add_argument("--push-latency", type=float, default=0.0, help="ms")
+    p.add_argument("--push-gone-rate", type=float, default=0.0)
+    p.add_argument("--seed", type=int, default=42)
+    args = p.parse_args()
+
+    server = ReplayServer(
+        args.facilities, args.courts, args.fill, args.churn,
+        args.latency, args.jitter, args.error_rate, args.throttle_rate,
+        args.push_latency, args.push_gone_rate, args.seed,
+    )
+    print(f"[REPLAY] facilities={len(server.facilities)} pages={len(server.listing.pages)} on {args.host}:{args.port}")
+    web.run_app(server.make_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
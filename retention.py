@@ -0,0 +1,165 @@
+import os
+import time
+import traceback
+from datetime import datetime, timezone, timedelta
+
+from alarm_registry import notify_change
+from db import get_db
+from metrics import METRICS
+from procutil import ProcessThread, app_path, read_json, write_json_atomic
+from scheduler import process_lock
+
+# =========================
+# 보관 기간 정리 설정
+# =========================
+# 정리 주기(초)
+RETENTION_INTERVAL = float(os.environ.get("RETENTION_INTERVAL", "3600"))
+# DELETE 1번에 지울 최대 행 수 / 테이블당 1회 실행에서 최대 배치 수
+RETENTION_BATCH = int(os.environ.get("RETENTION_BATCH", "5000"))
+RETENTION_MAX_BATCHES = int(os.environ.get("RETENTION_MAX_BATCHES", "100"))
+# 배치 사이 쉬는 시간(초) → 다른 쿼리에 양보
+RETENTION_PAUSE = float(os.environ.get("RETENTION_PAUSE", "0.05"))
+# sent_slots 보관 기간(일)
+SENT_RETENTION_DAYS = int(os.environ.get("SENT_RETENTION_DAYS", "1"))
+
+RETENTION_LOCK_PATH = os.environ.get("RETENTION_LOCK_PATH", app_path("retention.lock"))
+RETENTION_STATUS_PATH = os.environ.get("RETENTION_STATUS_PATH", app_path("retention_status.json"))
+
+KST = timezone(timedelta(hours=9))
+
+PURGED_ROWS = METRICS.counter(
+    "tennis_retention_purged_rows_total", "보관 기간이 지나 지운 행 수", ("table",)
+)
+RETENTION_SECONDS = METRICS.histogram(
+    "tennis_retention_seconds", "정리 1회 소요 시간(초)"
+)
+
+
+# =========================
+# 정리 대상
+# =========================
+def retention_today(now=None):
+    return (now or datetime.now(KST)).strftime("%Y%m%d")
+
+
+def retention_rules(now=None):
+    """
+    → [(table, where, params), ...]
+    where 는 init_db() 에서 만든 인덱스(date / sent_at)를 탄다
+    """
+    today = retention_today(now)
+    return [
+        ("alarms", "date < %s", (today,)),
+        ("sent_slots", "sent_at < NOW() - make_interval(days => %s)", (SENT_RETENTION_DAYS,)),
+    ]
+
+
+def purge_batch(cur, table, where, params, limit):
+    """
+    조건에 맞는 행을 최대 limit 개 삭제 → 지운 행 수
+    """
+    cur.execute(f"""
+        DELETE FROM {table}
+        WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM {table}
+            WHERE {where}
+            LIMIT %s
+        ))
+    """, (*params, limit))
+    return cur.rowcount
+
+
+def run_retention(batch=RETENTION_BATCH, max_batches=RETENTION_MAX_BATCHES, pause=RETENTION_PAUSE):
+    """
+    테이블마다 배치 단위로(배치마다 별도 트랜잭션) 삭제
+    → {"purged": {table: rows}, "incomplete": [table, ...], "duration_ms"}
+    """
+    started = time.perf_counter()
+    now = datetime.now(KST)
+    purged = {}
+    incomplete = []
+
+    for table, where, params in retention_rules(now):
+        total = 0
+        for _ in range(max_batches):
+            with get_db() as conn:
+                with conn.cursor() as cur:
+                    n = purge_batch(cur, table, where, params, batch)
+            total += n
+            if n < batch:
+                break
+            time.sleep(pause)
+        else:
+            # 배치 상한까지 다 씀 → 다음 확인 때 바로 이어서
+            incomplete.append(table)
+
+        purged[table] = total
+        if total:
+            PURGED_ROWS.inc(total, table=table)
+
+    # 지난 날짜 알람은 워커별 알람 레지스트리에서도 빼도록
+    if purged.get("alarms"):
+        with get_db() as conn:
+            with conn.cursor() as cur:
+                notify_change(cur, {"op": "prune", "before": retention_today(now)})
+
+    elapsed = time.perf_counter() - started
+    RETENTION_SECONDS.observe(elapsed)
+    return {
+        "purged": purged,
+        "incomplete": incomplete,
+        "duration_ms": round(elapsed * 1000, 1),
+    }
+
+
+# =========================
+# 백그라운드 실행 (refresh 와 별개)
+# =========================
+class RetentionWorker:
+    """
+    워커마다 스레드 1개가 주기적으로 확인하고,
+    lock 파일 + 마지막 실행 시각으로 전체에서 주기당 1번만 정리한다.
+    """
+
+    def __init__(self, interval=RETENTION_INTERVAL, lock_path=RETENTION_LOCK_PATH,
+                 status_path=RETENTION_STATUS_PATH):
+        self.interval = interval
+        self.lock_path = lock_path
+        self.status_path = status_path
+        self._thread = ProcessThread(self._loop, "retention")
+
+    def start(self):
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_if_due()
+            except Exception:
+                traceback.print_exc()
+            time.sleep(min(self.interval, 60))
+
+    def run_if_due(self):
+        with process_lock(self.lock_path) as acquired:
+            if not acquired:
+                return None
+
+            last = self.last_run()
+            if last and not last.get("incomplete") and time.time() - last.get("finished_ts", 0) < self.interval:
+                return None
+
+            summary = run_retention()
+            summary["finished_at"] = datetime.now(KST).isoformat()
+            summary["finished_ts"] = time.time()
+            self._save_status(summary)
+            print(f"[INFO] retention purged {summary['purged']} in {summary['duration_ms']}ms")
+            return summary
+
+    def _save_status(self, summary):
+        try:
+            write_json_atomic(self.status_path, summary, ensure_ascii=False)
+        except Exception as e:
+            print("[WARN] retention status save failed:", e)
+
+    def last_run(self):
+        return read_json(self.status_path, "retention status")
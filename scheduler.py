@@ -0,0 +1,199 @@
+import fcntl
+import os
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+
+from metrics import METRICS
+from procutil import ProcessThread, app_path, ensure_dir, read_json, write_json_atomic
+
+# =========================
+# 스케줄러 설정
+# =========================
+# 주기 실행 간격(초), 0 이면 /refresh 트리거로만 실행
+CRAWL_INTERVAL = float(os.environ.get("CRAWL_INTERVAL", "0"))
+# 워커 간 단일 실행용 lock 파일 / 마지막 사이클 상태 파일
+CRAWL_LOCK_PATH = os.environ.get("CRAWL_LOCK_PATH", app_path("crawl.lock"))
+CRAWL_STATUS_PATH = os.environ.get("CRAWL_STATUS_PATH", app_path("crawl_status.json"))
+
+KST = timezone(timedelta(hours=9))
+
+CYCLES = METRICS.counter("tennis_cycles_total", "크롤링 사이클 수", ("result",))
+CYCLE_SECONDS = METRICS.histogram("tennis_cycle_seconds", "크롤링 사이클 전체 소요 시간(초)")
+CYCLE_PHASE_SECONDS = METRICS.histogram(
+    "tennis_cycle_phase_seconds", "사이클 단계별 소요 시간(초)", ("phase",)
+)
+LAST_CYCLE = METRICS.gauge(
+    "tennis_last_cycle_timestamp_seconds", "마지막 사이클 종료 시각 (unix)", ("result",)
+)
+
+
+# =========================
+# 단계별 시간 측정
+# =========================
+class PhaseTimer:
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - t0) * 1000
+            self.phases[name] = round(self.phases.get(name, 0) + elapsed, 1)
+
+
+@contextmanager
+def process_lock(path):
+    """
+    다른 워커 프로세스가 크롤링 중이면 False
+    """
+    ensure_dir(os.path.dirname(path))
+    f = open(path, "a+")
+    try:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+    finally:
+        f.close()
+
+
+# =========================
+# 크롤링 사이클 스케줄러
+# =========================
+class CrawlScheduler:
+    """
+    run_cycle(options, timer) 를 백그라운드 스레드에서 실행한다.
+    - CRAWL_INTERVAL 주기 실행 + trigger() 로 즉시 실행
+    - 같은 프로세스/다른 워커 어디서든 동시에 한 사이클만 (single-flight)
+    """
+
+    def __init__(self, run_cycle, interval=CRAWL_INTERVAL,
+                 lock_path=CRAWL_LOCK_PATH, status_path=CRAWL_STATUS_PATH):
+        self.run_cycle = run_cycle
+        self.interval = interval
+        self.lock_path = lock_path
+        self.status_path = status_path
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = None
+        self._thread = ProcessThread(self._loop, "crawl-scheduler")
+        self.running = False
+        self.current = None
+
+    def start(self):
+        # gunicorn fork 이후 워커마다 스레드 1개
+        if self._thread.start():
+            print(f"[INFO] crawl scheduler started (pid={os.getpid()}, interval={self.interval})")
+
+    def trigger(self, options=None):
+        """
+        사이클 실행 요청. 이미 실행 중이면 False.
+        """
+        self.start()
+        if self.running:
+            return False
+        self._pending = options or {}
+        self._wake.set()
+        return True
+
+    def run_now(self, options=None):
+        """
+        현재 스레드에서 바로 실행 (?wait=1)
+        → 사이클 요약, 다른 곳에서 실행 중이면 None
+        """
+        return self._run(options or {})
+
+    def _loop(self):
+        while True:
+            fired = self._wake.wait(timeout=self.interval if self.interval > 0 else None)
+            self._wake.clear()
+            options = self._pending if fired else {}
+            self._pending = None
+            try:
+                self._run(options or {})
+            except Exception:
+                traceback.print_exc()
+
+    def _run(self, options):
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            with process_lock(self.lock_path) as acquired:
+                if not acquired:
+                    print("[INFO] crawl cycle already running in another worker")
+                    return None
+                return self._run_locked(options)
+        finally:
+            self._lock.release()
+
+    def _run_locked(self, options):
+        timer = PhaseTimer()
+        started = time.perf_counter()
+        summary = {
+            "pid": os.getpid(),
+            "started_at": datetime.now(KST).isoformat(),
+            "options": options,
+        }
+        self.running = True
+        self.current = summary
+        before = METRICS.sample()
+        try:
+            summary["result"] = self.run_cycle(options, timer)
+            summary["ok"] = True
+        except Exception as e:
+            traceback.print_exc()
+            summary["ok"] = False
+            summary["error"] = str(e)
+        finally:
+            self.running = False
+            self.current = None
+
+        summary["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        summary["phases"] = timer.phases
+        summary["finished_at"] = datetime.now(KST).isoformat()
+
+        result = "ok" if summary["ok"] else "error"
+        CYCLES.inc(result=result)
+        CYCLE_SECONDS.observe(summary["duration_ms"] / 1000)
+        for name, ms in timer.phases.items():
+            CYCLE_PHASE_SECONDS.observe(ms / 1000, phase=name)
+        LAST_CYCLE.set(time.time(), result=result)
+        # 이번 사이클 동안 늘어난 요청 수 / 오류 / DB / push 카운터
+        summary["metrics"] = METRICS.delta(before)
+        METRICS.flush()
+
+        self._save_status(summary)
+        print(f"[INFO] crawl cycle done {summary['duration_ms']}ms phases={timer.phases}")
+        return summary
+
+    def _save_status(self, summary):
+        try:
+            write_json_atomic(self.status_path, summary, ensure_ascii=False, default=str)
+        except Exception as e:
+            print("[WARN] crawl status save failed:", e)
+
+    def last_cycle(self):
+        return read_json(self.status_path, "crawl status")
+
+    def status(self):
+        return {
+            "running": self.running or self._is_locked_elsewhere(),
+            "interval": self.interval,
+            "last_cycle": self.last_cycle(),
+        }
+
+    def _is_locked_elsewhere(self):
+        with process_lock(self.lock_path) as acquired:
+            return not acquired
@@ -0,0 +1,261 @@
+import json
+import sys
+from array import array
+from datetime import date
+
+
+def _date_ordinal(d):
+    # "YYYYMMDD" → 일수
+    return date(int(d[:4]), int(d[4:6]), int(d[6:8])).toordinal()
+
+
+def _json(v):
+    return json.dumps(v, ensure_ascii=False)
+
+
+# =========================
+# 컬럼형 슬롯 저장소
+# =========================
+class SlotStore:
+    """
+    availability {cid: {date: [{"timeContent", "resveId"}, ...]}} 를
+    슬롯 1개 = 배열 칸 1개로 저장한다.
+
+    - cid / 시간대 / resveId 는 한 번만 저장하고 코드(int)로 참조
+    - 날짜는 base 기준 일수(day offset)
+    - 슬롯은 (cid, 날짜, 시간대) 순으로 정렬, (cid, day) → [start, end) 범위 인덱스
+    """
+
+    def __init__(self):
+        self.cids = []          # cid 코드 → cid
+        self.times = []         # 시간대 코드 → timeContent
+        self.resve_ids = [None]  # resveId 코드 → resveId (0 = 없음)
+        self.base = 0           # day offset 0 의 날짜 (ordinal)
+        self.dates = []         # day offset → "YYYYMMDD"
+
+        self.cid_col = array("H")
+        self.day_col = array("H")
+        self.time_col = array("H")
+        self.resve_col = array("I")
+
+        # (cid 코드, day offset) → (start, end)
+        self.ranges = {}
+
+    # -------------------------
+    # 생성
+    # -------------------------
+    @classmethod
+    def from_availability(cls, availability):
+        store = cls()
+        all_dates = {d for days in availability.values() for d in days}
+        if not all_dates:
+            return store
+
+        ordinals = {d: _date_ordinal(d) for d in all_dates}
+        store.base = min(ordinals.values())
+        span = max(ordinals.values()) - store.base + 1
+        store.dates = [""] * span
+        for d, o in ordinals.items():
+            store.dates[o - store.base] = d
+
+        time_codes = {}
+        resve_codes = {None: 0}
+
+        for cid in sorted(availability):
+            days = availability[cid]
+            c = len(store.cids)
+            added = False
+
+            for d in sorted(days):
+                # 같은 시간대는 하나만 (먼저 나온 것)
+                by_time = {}
+                for s in days[d]:
+                    t = s.get("timeContent")
+                    if t and t not in by_time:
+                        by_time[t] = s.get("resveId")
+                if not by_time:
+                    continue
+
+                day = ordinals[d] - store.base
+                start = len(store.time_col)
+                for t in sorted(by_time):
+                    tc = time_codes.get(t)
+                    if tc is None:
+                        tc = time_codes[t] = len(store.times)
+                        store.times.append(sys.intern(t))
+
+                    r = by_time[t]
+                    rc = resve_codes.get(r)
+                    if rc is None:
+                        rc = resve_codes[r] = len(store.resve_ids)
+                        store.resve_ids.append(r)
+
+                    store.cid_col.append(c)
+                    store.day_col.append(day)
+                    store.time_col.append(tc)
+                    store.resve_col.append(rc)
+
+                store.ranges[(c, day)] = (start, len(store.time_col))
+                added = True
+
+            if added:
+                store.cids.append(sys.intern(cid))
+
+        return store
+
+    # -------------------------
+    # 조회
+    # -------------------------
+    def __len__(self):
+        return len(self.time_col)
+
+    def _cid_code(self, cid):
+        codes = self.__dict__.get("_cid_codes")
+        if codes is None:
+            codes = self._cid_codes = {v: c for c, v in enumerate(self.cids)}
+        return codes.get(cid)
+
+    def _code(self, cid, d):
+        c = self._cid_code(cid)
+        if c is None:
+            return None
+        try:
+            return c, _date_ordinal(d) - self.base
+        except (TypeError, ValueError):
+            return None
+
+    def keys(self):
+        """
+        슬롯이 있는 (cid, date) 들
+        """
+        for c, day in self.ranges:
+            yield self.cids[c], self.dates[day]
+
+    def times_for(self, cid, d):
+        """
+        (cid, date) 의 timeContent 목록 (정렬됨)
+        """
+        rng = self.ranges.get(self._code(cid, d))
+        if rng is None:
+            return []
+        times = self.times
+        return [times[tc] for tc in self.time_col[rng[0]:rng[1]]]
+
+    def slots_for(self, cid, d):
+        """
+        (cid, date) 의 [(timeContent, resveId), ...]
+        """
+        rng = self.ranges.get(self._code(cid, d))
+        if rng is None:
+            return []
+        return [
+            (self.times[self.time_col[i]], self.resve_ids[self.resve_col[i]])
+            for i in range(*rng)
+        ]
+
+    def group_index(self, court_group_map):
+        """
+        → {(court_group, date): {timeContent, ...}}
+        """
+        code_to_group = {}
+        for group, cids in court_group_map.items():
+            for cid in cids:
+                c = self._cid_code(cid)
+                if c is not None:
+                    code_to_group[c] = group
+
+        index = {}
+        times = self.times
+        time_col = self.time_col
+        for (c, day), (start, end) in self.ranges.items():
+            group = code_to_group.get(c)
+            if group is None:
+                continue
+            key = (group, self.dates[day])
+            bucket = index.get(key)
+            if bucket is None:
+                bucket = index[key] = set()
+            bucket.update(times[tc] for tc in time_col[start:end])
+
+        return index
+
+    # -------------------------
+    # 직렬화
+    # -------------------------
+    def to_json(self):
+        """
+        availability JSON 문자열 (json.dumps(to_availability()) 와 동일)
+        시간대 / resveId 는 코드별로 한 번만 인코딩한다.
+        """
+        times = [_json(t) for t in self.times]
+        resve = [_json(r) for r in self.resve_ids]
+        dates = [_json(d) for d in self.dates]
+        time_col = self.time_col
+        resve_col = self.resve_col
+
+        # (시간대, resveId) 조합별 슬롯 JSON
+        encoded = {}
+
+        def slot_json(i):
+            key = (time_col[i], resve_col[i])
+            s = encoded.get(key)
+            if s is None:
+                s = encoded[key] = '{"timeContent":' + times[key[0]] + ',"resveId":' + resve[key[1]] + "}"
+            return s
+
+        # ranges 는 (cid, 날짜) 순으로 만들어져 있다
+        parts = []
+        days = []
+        prev = None
+        for (c, day), (start, end) in self.ranges.items():
+            if c != prev:
+                if days:
+                    parts.append(_json(self.cids[prev]) + ":{" + ",".join(days) + "}")
+                days = []
+                prev = c
+            days.append(dates[day] + ":[" + ",".join(map(slot_json, range(start, end))) + "]")
+        if days:
+            parts.append(_json(self.cids[prev]) + ":{" + ",".join(days) + "}")
+
+        return "{" + ",".join(parts) + "}"
+
+    def to_availability(self):
+        availability = {}
+        for (c, day), (start, end) in self.ranges.items():
+            availability.setdefault(self.cids[c], {})[self.dates[day]] = [
+                {"timeContent": self.times[self.time_col[i]], "resveId": self.resve_ids[self.resve_col[i]]}
+                for i in range(start, end)
+            ]
+        return availability
+
+    def to_state(self):
+        """
+        워커 간 공유 파일(JSON)에 그대로 넣을 수 있는 dict
+        """
+        return {
+            "cids": self.cids,
+            "times": self.times,
+            "resve_ids": self.resve_ids,
+            "base": self.base,
+            "dates": self.dates,
+            "cid_col": self.cid_col.tolist(),
+            "day_col": self.day_col.tolist(),
+            "time_col": self.time_col.tolist(),
+            "resve_col": self.resve_col.tolist(),
+            "ranges": [[c, day, start, end] for (c, day), (start, end) in self.ranges.items()],
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        store = cls()
+        store.cids = state["cids"]
+        store.times = state["times"]
+        store.resve_ids = state["resve_ids"]
+        store.base = state["base"]
+        store.dates = state["dates"]
+        store.cid_col = array("H", state["cid_col"])
+        store.day_col = array("H", state["day_col"])
+        store.time_col = array("H", state["time_col"])
+        store.resve_col = array("I", state["resve_col"])
+        store.ranges = {(c, day): (start, end) for c, day, start, end in state["ranges"]}
+        return store
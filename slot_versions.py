@@ -0,0 +1,103 @@
+# =========================
+# 전체 슬롯 스냅샷 (버전별 diff)
+# =========================
+class SlotVersions:
+    """
+    직전 크롤링까지의 전체 빈자리 1벌 + 각 슬롯이 처음 보인 크롤링 버전
+
+      slots: {court_group: {date: {time_content: first_seen}}}
+      version: 마지막으로 끝까지 반영한 크롤링 버전
+
+    알람은 등록 시점의 version(armed_version)만 기억하고,
+    first_seen > armed_version 인 슬롯이 그 알람의 "새 빈자리"가 된다.
+    """
+
+    def __init__(self, version=0, slots=None):
+        self.version = version
+        self.slots = slots or {}
+        # 사이클 도중 바뀌었으면 False → 다음 사이클에서 DB 에서 다시 로드
+        self.clean = True
+
+    @classmethod
+    def from_rows(cls, version, rows):
+        """
+        rows: [(court_group, date, time_content, first_seen), ...]
+        """
+        slots = {}
+        for group, date, t, first_seen in rows:
+            slots.setdefault(group, {}).setdefault(date, {})[t] = first_seen
+        return cls(version, slots)
+
+    def __len__(self):
+        return sum(len(times) for dates in self.slots.values() for times in dates.values())
+
+    def groups(self):
+        return set(self.slots)
+
+    def diff(self, slot_index, groups, skip=()):
+        """
+        slot_index: build_slot_index() 결과 (이번 크롤링, groups 의 그룹만)
+        skip: 조회 실패한 {(court_group, date), ...} → 이전 상태 유지 (diff 없음)
+
+        → (opened, closed)  둘 다 {(court_group, date): [time_content, ...]}
+        """
+        current = {}
+        for (group, date), times in slot_index.items():
+            current.setdefault(group, {})[date] = times
+
+        opened = {}
+        closed = {}
+        for group in groups:
+            prev_dates = self.slots.get(group, {})
+            new_dates = current.get(group, {})
+
+            for date, times in new_dates.items():
+                if (group, date) in skip:
+                    continue
+                prev = prev_dates.get(date, {})
+                added = [t for t in times if t not in prev]
+                if added:
+                    opened[(group, date)] = sorted(added)
+
+            for date, prev in prev_dates.items():
+                if (group, date) in skip:
+                    continue
+                times = new_dates.get(date, ())
+                removed = [t for t in prev if t not in times]
+                if removed:
+                    closed[(group, date)] = sorted(removed)
+
+        return opened, closed
+
+    def apply(self, opened, closed, version):
+        for (group, date), times in closed.items():
+            dates = self.slots.get(group)
+            if dates is None:
+                continue
+            prev = dates.get(date)
+            if prev is None:
+                continue
+            for t in times:
+                prev.pop(t, None)
+            if not prev:
+                del dates[date]
+            if not dates:
+                del self.slots[group]
+
+        for (group, date), times in opened.items():
+            prev = self.slots.setdefault(group, {}).setdefault(date, {})
+            for t in times:
+                prev[t] = version
+
+    def recent(self, groups, since):
+        """
+        groups 안에서 first_seen >= since 인 슬롯
+        → {(court_group, date): {time_content: first_seen}}
+        """
+        found = {}
+        for group in groups:
+            for date, times in self.slots.get(group, {}).items():
+                fresh = {t: v for t, v in times.items() if v >= since}
+                if fresh:
+                    found[(group, date)] = fresh
+        return found
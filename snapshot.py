@@ -0,0 +1,342 @@
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from flask import Response
+
+from procutil import ProcessThread, app_path, ensure_dir, write_json_atomic
+from slot_store import SlotStore
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+# 보관할 버전별 변경분 개수 (이보다 오래된 버전은 전체 스냅샷으로)
+DELTA_HISTORY = int(os.environ.get("DATA_DELTA_HISTORY", "50"))
+# 워커들이 같이 읽는 스냅샷 파일
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", app_path("snapshot.json"))
+
+
+# =========================
+# /data 스냅샷 (크롤링 1회당 1번 직렬화/압축)
+# =========================
+def _dumps(v):
+    return json.dumps(v, ensure_ascii=False, separators=(",", ":"))
+
+
+def build_snapshot(facilities, slots, updated_at, version=None):
+    """
+    slots: SlotStore → availability 는 슬롯 배열에서 바로 직렬화
+    """
+    facilities_json = _dumps(facilities)
+    availability_json = slots.to_json()
+    version_json = _dumps(version)
+    body = (
+        '{"facilities":' + facilities_json
+        + ',"availability":' + availability_json
+        + ',"updated_at":' + _dumps(updated_at)
+        + ',"version":' + version_json
+        + "}"
+    ).encode("utf-8")
+
+    # ETag 은 내용(시설 / 빈자리 / 버전)만으로 → 크롤링 시각만 다르면 같은 ETag (304)
+    h = hashlib.sha256()
+    for part in (facilities_json, availability_json, version_json):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    digest = h.hexdigest()[:32]
+
+    encodings = {
+        "identity": body,
+        "gzip": gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+    }
+    if brotli is not None:
+        encodings["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    return {
+        "digest": digest,
+        "encodings": encodings,
+        "updated_at": updated_at,
+        "version": version,
+    }
+
+
+def _etag(digest, encoding):
+    # 인코딩별로 다른 strong ETag
+    return digest if encoding == "identity" else f"{digest}-{encoding}"
+
+
+def serve_snapshot(snapshot, request):
+    """
+    If-None-Match 가 현재 내용과 같으면 304,
+    아니면 Accept-Encoding 에 맞는 미리 압축된 바이트를 그대로 보낸다.
+    """
+    digest = snapshot["digest"]
+    encodings = snapshot["encodings"]
+
+    offered = [e for e in ("br", "gzip") if e in encodings] + ["identity"]
+    encoding = request.accept_encodings.best_match(offered) or "identity"
+    etag = _etag(digest, encoding)
+
+    # 인코딩과 상관없이 내용이 같으면 304
+    client_tags = request.if_none_match
+    if client_tags and (
+        client_tags.star_tag
+        or any(client_tags.contains_weak(_etag(digest, e)) for e in encodings)
+    ):
+        resp = Response(status=304)
+    else:
+        resp = Response(encodings[encoding], mimetype="application/json")
+        if encoding != "identity":
+            resp.headers["Content-Encoding"] = encoding
+
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["Vary"] = "Accept-Encoding"
+    return resp
+
+
+# =========================
+# 버전별 변경분 (delta)
+# =========================
+def diff_availability(old, new):
+    """
+    old / new: SlotStore
+    → (added, removed)
+      added: {cid: {date: [slot, ...]}}
+      removed: {cid: {date: [timeContent, ...]}}
+    """
+    added = {}
+    removed = {}
+    for cid, date in set(old.keys()) | set(new.keys()):
+        before = old.times_for(cid, date)
+        after = new.slots_for(cid, date)
+        if before == [t for t, _ in after]:
+            continue
+
+        before = set(before)
+        add = [{"timeContent": t, "resveId": r} for t, r in after if t not in before]
+        after = {t for t, _ in after}
+        rem = [t for t in sorted(before) if t not in after]
+        if add:
+            added.setdefault(cid, {})[date] = add
+        if rem:
+            removed.setdefault(cid, {})[date] = rem
+
+    return added, removed
+
+
+class DeltaLog:
+    """
+    최근 DELTA_HISTORY 개 버전의 변경분을 보관하는 링 버퍼
+    """
+
+    def __init__(self, maxlen=DELTA_HISTORY, entries=(), version=None):
+        self.entries = deque(entries, maxlen=maxlen)
+        self.version = version
+        self._lock = threading.Lock()
+
+    def copy(self):
+        with self._lock:
+            return DeltaLog(self.entries.maxlen, list(self.entries), self.version)
+
+    def record(self, version, added, removed):
+        with self._lock:
+            self.entries.append({
+                "base": self.version,
+                "version": version,
+                "added": added,
+                "removed": removed,
+            })
+            self.version = version
+
+    def reset(self, version):
+        # 시설 목록이 바뀌는 등 delta 로 표현 못 하는 변경
+        with self._lock:
+            self.entries.clear()
+            self.version = version
+
+    def since(self, version):
+        """
+        version 이후 변경분을 합쳐서 (현재 버전, added, removed) 로 반환
+        너무 오래됐거나 모르는 버전이면 None
+        """
+        with self._lock:
+            current = self.version
+            if version == current:
+                return current, {}, {}
+
+            entries = list(self.entries)
+            start = next((i for i, e in enumerate(entries) if e["base"] == version), None)
+            if start is None:
+                return None
+
+            # (cid, date, time) → slot(추가) / None(삭제)
+            changes = {}
+            for e in entries[start:]:
+                for cid, days in e["removed"].items():
+                    for date, times in days.items():
+                        for t in times:
+                            changes[(cid, date, t)] = None
+                for cid, days in e["added"].items():
+                    for date, slots in days.items():
+                        for s in slots:
+                            changes[(cid, date, s.get("timeContent"))] = s
+
+        added = {}
+        removed = {}
+        for (cid, date, t), s in changes.items():
+            if s is None:
+                removed.setdefault(cid, {}).setdefault(date, []).append(t)
+            else:
+                added.setdefault(cid, {}).setdefault(date, []).append(s)
+        return current, added, removed
+
+
+# =========================
+# 워커 간 공유 스냅샷 저장소
+# =========================
+def encode_state(state):
+    """
+    publish_cache() 의 상태 → JSON 으로 쓸 수 있는 dict
+    (SlotStore 는 컬럼 리스트, 미리 압축한 /data 바이트는 base64)
+    """
+    snapshot = state["snapshot"]
+    return {
+        "facilities": state["facilities"],
+        "slots": state["slots"].to_state(),
+        "updated_at": state["updated_at"],
+        "version": state["version"],
+        "snapshot": {
+            "digest": snapshot["digest"],
+            "updated_at": snapshot["updated_at"],
+            "version": snapshot["version"],
+            "encodings": {
+                name: base64.b64encode(body).decode("ascii")
+                for name, body in snapshot["encodings"].items()
+            },
+        },
+        "deltas": list(state["deltas"].entries),
+    }
+
+
+def decode_state(raw):
+    snapshot = raw["snapshot"]
+    snapshot["encodings"] = {
+        name: base64.b64decode(body) for name, body in snapshot["encodings"].items()
+    }
+    raw["slots"] = SlotStore.from_state(raw["slots"])
+    raw["deltas"] = DeltaLog(entries=raw["deltas"], version=raw["version"])
+    return raw
+
+
+class SnapshotStore:
+    """
+    크롤링한 워커가 JSON 파일 1개로 발행(임시파일 → rename),
+    다른 워커는 stat 으로 바뀐 경우에만 다시 읽는다.
+    마지막 크롤링 시각은 내용과 따로 빈 파일의 mtime 으로 남긴다 (내용이 같아도 매 크롤링 갱신)
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self.checked_path = path + ".checked"
+        self._state = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp:
+            return self._state
+
+        with self._lock:
+            if stamp == self._stamp:
+                return self._state
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    state = decode_state(json.load(f))
+            except Exception as e:
+                print("[WARN] snapshot load failed:", e)
+                return self._state
+
+            self._state = state
+            self._stamp = stamp
+            return state
+
+    def publish(self, state):
+        raw = encode_state(state)
+
+        write_json_atomic(self.path, raw, ensure_ascii=False, separators=(",", ":"))
+
+        st = os.stat(self.path)
+        with self._lock:
+            self._state = state
+            self._stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        self.touch()
+
+    def touch(self):
+        ensure_dir(os.path.dirname(self.checked_path))
+        with open(self.checked_path, "a"):
+            pass
+        os.utime(self.checked_path)
+
+    def checked_at(self):
+        """
+        → 마지막 크롤링 시각 (unix), 아직 없으면 None
+        """
+        try:
+            return os.stat(self.checked_path).st_mtime
+        except FileNotFoundError:
+            return None
+
+
+# =========================
+# 스냅샷 변경 알림 (SSE 연결들이 대기)
+# =========================
+class SnapshotWatcher:
+    """
+    워커당 스레드 1개가 스냅샷 파일을 poll 하고,
+    버전이 바뀌면 대기 중인 /stream 연결을 모두 깨운다.
+    """
+
+    def __init__(self, store, interval=1.0):
+        self.store = store
+        self.interval = interval
+        self.version = None
+        self._cond = threading.Condition()
+        self._thread = ProcessThread(self._loop, "snapshot-watcher")
+
+    def start(self):
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            state = self.store.load()
+            version = state["version"] if state else None
+            if version != self.version:
+                with self._cond:
+                    self.version = version
+                    self._cond.notify_all()
+            time.sleep(self.interval)
+
+    def wait(self, version, timeout):
+        """
+        버전이 version 과 달라지거나 timeout 이 지나면 반환 → 현재 버전
+        """
+        with self._cond:
+            if self.version == version:
+                self._cond.wait(timeout)
+            return self.version
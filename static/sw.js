@@ -1,10 +1,31 @@
 self.addEventListener("push", event => {
   const data = event.data.json();
 
-  self.registration.showNotification(data.title, {
-    body: data.body,
-    icon: "/icon.png",
-    vibrate: [200, 100, 200],
-    tag: "tennis-alert"
-  });
+  // 같은 코트/날짜 알림은 tag 가 같아서 새 알림이 이전 것을 대체한다
+  event.waitUntil(
+    self.registration.showNotification(data.title, {
+      body: data.body,
+      icon: "/icon.png",
+      vibrate: [200, 100, 200],
+      tag: data.tag || "tennis-alert",
+      renotify: !!data.tag,
+      data: { url: data.url || "/", slots: data.slots || [], links: data.links || {} }
+    })
+  );
+});
+
+self.addEventListener("notificationclick", event => {
+  event.notification.close();
+  const url = (event.notification.data && event.notification.data.url) || "/";
+
+  event.waitUntil(
+    clients.matchAll({ type: "window", includeUncontrolled: true }).then(windows => {
+      for (const w of windows) {
+        if (w.url === url && "focus" in w) {
+          return w.focus();
+        }
+      }
+      return clients.openWindow(url);
+    })
+  );
 });
@@ -1,99 +1,283 @@
 import aiohttp
 import asyncio
+import hashlib
+import json
+import os
+import queue
+import random
 import re
-from bs4 import BeautifulSoup
+import threading
+import time
 from datetime import datetime, timedelta
 import calendar
+from collections import namedtuple
 
+from facility_parser import parse_facility_html
+from crawl_limits import CrawlLimits, BudgetExceeded, THROTTLE_STATUS, CONCURRENCY_MAX, limit_request
+from metrics import METRICS
+from procutil import app_path, read_json, write_json_atomic
+
+# 크롤링 대상 사이트 (로컬 재생 서버로 바꿔서 벤치마크: replay_server.py)
+SITE_ROOT = os.environ.get("CRAWL_SITE_ROOT", "https://publicsports.yongin.go.kr").rstrip("/")
 # 테니스 시설 목록 endpoint
-BASE_URL = "https://publicsports.yongin.go.kr/publicsports/sports/selectFcltyRceptResveListU.do"
+LIST_PATH = "/publicsports/sports/selectFcltyRceptResveListU.do"
+BASE_URL = SITE_ROOT + LIST_PATH
+# 날짜별 예약 가능 시간 endpoint
+TIMES_PATH = "/publicsports/sports/selectRegistTimeByChosenDateFcltyRceptResveApply.do"
+TIMES_URL = SITE_ROOT + TIMES_PATH
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0",
     "Referer": BASE_URL
 }
 
-def get_connector():
-    return aiohttp.TCPConnector(limit=60, ssl=False)
+# --------------------------------------------------------------
+# 요청 타임아웃 / 재시도 (지터 포함 지수 백오프)
+# --------------------------------------------------------------
+FETCH_TIMEOUT = float(os.environ.get("CRAWL_FETCH_TIMEOUT", "10"))
+FETCH_RETRIES = int(os.environ.get("CRAWL_FETCH_RETRIES", "2"))
+FETCH_BACKOFF = float(os.environ.get("CRAWL_FETCH_BACKOFF", "0.5"))
 
+# 날짜별 조회 결과: 성공(슬롯 있음) / 성공(슬롯 없음) / 실패
+OK = "ok"
+EMPTY = "empty"
+FAILED = "failed"
+FetchResult = namedtuple("FetchResult", ["status", "data", "error"])
 
 # --------------------------------------------------------------
-# ★ 자동 쿠키 갱신: 첫 요청에서 서버가 내려주는 쿠키를 session에 저장
+# 증분 크롤링 설정
+#   hot  : 알람이 걸린 날짜 / 최근 변동 → 매 사이클
+#   warm : WARM_DAYS 이내 날짜 → WARM_INTERVAL 초마다
+#   cold : 그 외 먼 날짜 → COLD_INTERVAL 초마다
 # --------------------------------------------------------------
-async def init_session(session):
-    async with session.get(BASE_URL, params={"pageIndex":1}) as resp:
-        set_cookie = resp.cookies.get("JSESSIONID")
-        if set_cookie:
-            session.cookie_jar.update_cookies({"JSESSIONID": set_cookie.value})
-            print("[INFO] New JSESSIONID:", set_cookie.value)
-        else:
-            print("[WARN] 서버에서 쿠키를 내려주지 않음")
+INCREMENTAL = os.environ.get("CRAWL_INCREMENTAL", "1") == "1"
+CHURN_WINDOW = float(os.environ.get("CRAWL_CHURN_WINDOW", "3600"))
+WARM_DAYS = int(os.environ.get("CRAWL_WARM_DAYS", "7"))
+WARM_INTERVAL = float(os.environ.get("CRAWL_WARM_INTERVAL", "900"))
+COLD_INTERVAL = float(os.environ.get("CRAWL_COLD_INTERVAL", "3600"))
+
+# --------------------------------------------------------------
+# 시설 목록 캐시 (시설은 거의 안 바뀜)
+#   TTL 이내 → 목록 크롤링 생략
+#   TTL 지남 → 첫 페이지 fingerprint 만 비교, 같으면 TTL 연장
+# --------------------------------------------------------------
+FACILITY_CACHE_PATH = os.environ.get("FACILITY_CACHE_PATH", app_path("facility_cache.json"))
+FACILITY_CACHE_TTL = float(os.environ.get("FACILITY_CACHE_TTL", "21600"))
+
+# (rid, date) → 마지막 결과 / 마지막 변경 시각 / 마지막 조회 시각
+CRAWL_STATE = {
+    "slots": {},
+    "changed_at": {},
+    "polled_at": {},
+}
+# 사이클은 아무 워커에서나 돌기 때문에 CRAWL_STATE 를 파일로 넘겨받는다
+# (워커마다 따로 들고 있으면 오래된 cold 날짜 결과로 발행 → 슬롯이 닫혔다 다시 열린 것처럼 보인다)
+CRAWL_STATE_PATH = os.environ.get("CRAWL_STATE_PATH", app_path("crawl_state.json"))
+_crawl_state_stamp = None   # 이 프로세스가 마지막으로 읽거나 쓴 파일
+
+
+def backoff_delay(attempt):
+    # full jitter: 0 ~ BACKOFF * 2^attempt
+    return random.uniform(0, FETCH_BACKOFF * (2 ** attempt))
 
 
 # --------------------------------------------------------------
-# HTML 요청
+# 메트릭
+# --------------------------------------------------------------
+CRAWL_REQUESTS = METRICS.counter(
+    "tennis_crawl_requests_total", "upstream 요청 수 (endpoint / 결과별)", ("endpoint", "outcome")
+)
+CRAWL_REQUEST_SECONDS = METRICS.histogram(
+    "tennis_crawl_request_seconds", "upstream 응답 시간(초)", ("endpoint",)
+)
+CRAWL_PHASE_SECONDS = METRICS.histogram(
+    "tennis_crawl_phase_seconds", "크롤링 단계별 소요 시간(초)", ("phase",)
+)
+CRAWL_DATES = METRICS.counter(
+    "tennis_crawl_dates_total", "(시설, 날짜) 조회 결과 (polled / skipped / failed)", ("result",)
+)
+CRAWL_CONCURRENCY = METRICS.gauge(
+    "tennis_crawl_concurrency_limit", "크롤링 종료 시점의 AIMD 동시성 한도"
+)
+
+
+def status_outcome(status):
+    # 429 / 502~504 는 따로, 나머지는 4xx / 5xx
+    if status in THROTTLE_STATUS:
+        return f"http_{status}"
+    return f"http_{status // 100}xx"
+
+
+def error_outcome(e):
+    if isinstance(e, BudgetExceeded):
+        return "budget"
+    if isinstance(e, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(e, aiohttp.ClientConnectionError):
+        return "connection"
+    if isinstance(e, (aiohttp.ContentTypeError, ValueError)):
+        return "bad_response"
+    return "error"
+
+
+def record_request(endpoint, outcome, started=None):
+    CRAWL_REQUESTS.inc(endpoint=endpoint, outcome=outcome)
+    if started is not None:
+        CRAWL_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+
+
+def request_timeout():
+    return aiohttp.ClientTimeout(total=FETCH_TIMEOUT)
+
+
+def get_connector():
+    # 실제 동시 요청 수는 CrawlLimits 가 조절, 커넥터는 상한만
+    return aiohttp.TCPConnector(limit=CONCURRENCY_MAX, ssl=False)
+
+
+# --------------------------------------------------------------
+# ★ 자동 쿠키 갱신: 첫 요청에서 서버가 내려주는 쿠키를 session에 저장
 # --------------------------------------------------------------
-async def fetch_html(session, url, params=None):
+async def init_session(session, limits=None):
+    outcome = "error"
+    started = None
     try:
-        async with session.get(url, params=params) as resp:
-            return await resp.text()
+        async with limit_request(limits, BASE_URL):
+            started = time.perf_counter()
+            async with session.get(BASE_URL, params={"pageIndex":1}) as resp:
+                outcome = "ok" if resp.status < 400 else status_outcome(resp.status)
+                set_cookie = resp.cookies.get("JSESSIONID")
+                if set_cookie:
+                    session.cookie_jar.update_cookies({"JSESSIONID": set_cookie.value})
+                    print("[INFO] New JSESSIONID:", set_cookie.value)
+                else:
+                    print("[WARN] 서버에서 쿠키를 내려주지 않음")
     except Exception as e:
-        print("[ERROR] fetch_html:", e)
-        return ""
+        outcome = error_outcome(e)
+        raise
+    finally:
+        record_request("init", outcome, started)
 
 
 # --------------------------------------------------------------
-# 시설 HTML 파싱
+# HTML 요청
 # --------------------------------------------------------------
-def parse_facility_html(html):
-    soup = BeautifulSoup(html, "html.parser")
-    items = soup.select("li.reserve_box_item")
-    results = {}
+async def fetch_html(session, url, params=None, limits=None, endpoint="list"):
+    """
+    실패 시 재시도 후 "" 반환
+    """
+    for attempt in range(FETCH_RETRIES + 1):
+        outcome = "error"
+        started = None
+        try:
+            async with limit_request(limits, url) as slot:
+                started = time.perf_counter()
+                async with session.get(url, params=params, timeout=request_timeout()) as resp:
+                    if resp.status < 400:
+                        html = await resp.text()
+                        outcome = "ok"
+                        return html
+                    outcome = status_outcome(resp.status)
+                    if resp.status in THROTTLE_STATUS:
+                        slot.throttled()
+                    print("[WARN] fetch_html status:", resp.status)
+        except BudgetExceeded as e:
+            outcome = error_outcome(e)
+            print("[ERROR] fetch_html:", e)
+            return ""
+        except Exception as e:
+            outcome = error_outcome(e)
+            print("[ERROR] fetch_html:", repr(e))
+        finally:
+            record_request(endpoint, outcome, started)
+
+        if attempt < FETCH_RETRIES:
+            await asyncio.sleep(backoff_delay(attempt))
+
+    return ""
 
-    for li in items:
-        a = li.select_one("div.btn_wrap a[href*='selectFcltyRceptResveViewU.do']")
-        if not a:
-            continue
 
-        href = a.get("href", "")
-        m = re.search(r"resveId=(\d+)", href)
-        if not m:
-            continue
+# --------------------------------------------------------------
+# 시설 HTML 파싱 (facility_parser.py, 이벤트 루프 밖에서 실행)
+# --------------------------------------------------------------
+async def parse_facility_html_async(html):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, parse_facility_html, html)
+
 
-        rid = m.group(1)
-        title_div = li.select_one("div.reserve_title")
-        pos_div = title_div.select_one("div.reserve_position")
+# --------------------------------------------------------------
+# 시설 목록 캐시 파일
+# --------------------------------------------------------------
+def load_facility_cache():
+    try:
+        with open(FACILITY_CACHE_PATH, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if isinstance(cache, dict) and cache.get("facilities"):
+            return cache
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print("[WARN] facility cache load failed:", e)
+    return None
 
-        location = pos_div.get_text(strip=True) if pos_div else ""
-        if pos_div:
-            pos_div.extract()
 
-        title = title_div.get_text(strip=True)
+def save_facility_cache(cache):
+    # 다른 워커가 읽는 중일 수 있으니 임시파일 → rename
+    try:
+        write_json_atomic(FACILITY_CACHE_PATH, cache, ensure_ascii=False)
+    except Exception as e:
+        print("[WARN] facility cache save failed:", e)
 
-        results[rid] = {"title": title, "location": location}
 
-    return results
+def page_fingerprint(html):
+    # 첫 페이지의 resveId 목록 + 페이지 수 → 시설 추가/삭제 감지용
+    rids = sorted(set(re.findall(r"resveId=(\d+)", html)))
+    pages = sorted(set(re.findall(r"pageIndex=(\d+)", html)), key=int)
+    raw = ",".join(rids) + "|" + ",".join(pages)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
 
 # --------------------------------------------------------------
 # ① 테니스 시설 전체 페이지 크롤링
 # --------------------------------------------------------------
-async def fetch_facilities(session):
+FACILITY_PARAMS = {
+    "searchFcltyFieldNm": "ITEM_01",  # ★ 테니스 필터
+    "pageUnit": 20,
+    "pageIndex": 1,
+    "checkSearchMonthNow": "false"
+}
 
-    facilities = {}
 
-    base_params = {
-        "searchFcltyFieldNm": "ITEM_01",  # ★ 테니스 필터
-        "pageUnit": 20,
-        "pageIndex": 1,
-        "checkSearchMonthNow": "false"
-    }
+async def fetch_facilities(session, limits=None):
+    """
+    → (facilities, complete)
+      complete: 모든 페이지를 받은 목록인지 (캐시도 완전한 목록만 저장)
+      첫 페이지 / 일부 페이지 실패면 False → 목록에 없는 시설을 "없어졌다"고 보면 안 된다
+    """
+    now = time.time()
+    cache = load_facility_cache()
+
+    # 0) TTL 이내면 목록 크롤링 생략
+    if cache and now - cache.get("checked_at", 0) < FACILITY_CACHE_TTL:
+        print(f"[INFO] facility cache hit ({len(cache['facilities'])})")
+        return cache["facilities"], True
+
+    facilities = {}
+    base_params = dict(FACILITY_PARAMS)
 
     # 1) 첫 페이지 요청 + 자동 쿠키 갱신 적용됨
-    html = await fetch_html(session, BASE_URL, params=base_params)
+    html = await fetch_html(session, BASE_URL, params=base_params, limits=limits)
     if not html:
         print("[ERROR] 첫 페이지 가져오기 실패")
-        return facilities
+        return (cache["facilities"] if cache else facilities), False
+
+    # 1-1) 첫 페이지가 그대로면 캐시 재사용
+    fingerprint = page_fingerprint(html)
+    if cache and cache.get("fingerprint") == fingerprint:
+        cache["checked_at"] = now
+        save_facility_cache(cache)
+        print(f"[INFO] facility list unchanged ({len(cache['facilities'])})")
+        return cache["facilities"], True
 
     # 2) pageIndex=숫자 전체 추출 → 마지막 페이지 파악
     page_indices = re.findall(r"pageIndex=(\d+)", html)
@@ -102,47 +286,83 @@ async def fetch_facilities(session):
     print(f"[INFO] 총 페이지 수: {max_page}")
 
     # 3) 첫 페이지 파싱
-    facilities.update(parse_facility_html(html))
+    facilities.update(await parse_facility_html_async(html))
 
     # 4) 나머지 페이지 병렬 요청
     tasks = []
     for page in range(2, max_page + 1):
         params2 = dict(base_params)
         params2["pageIndex"] = page
-        tasks.append(fetch_html(session, BASE_URL, params=params2))
+        tasks.append(fetch_html(session, BASE_URL, params=params2, limits=limits))
 
     pages_html = await asyncio.gather(*tasks)
+    complete = True
     for html in pages_html:
         if html:
-            facilities.update(parse_facility_html(html))
+            facilities.update(await parse_facility_html_async(html))
+        else:
+            complete = False
+
+    # 일부 페이지 실패 시 캐시하지 않음 (다음 사이클에 다시)
+    if facilities and complete:
+        save_facility_cache({
+            "facilities": facilities,
+            "fingerprint": fingerprint,
+            "checked_at": now,
+        })
 
-    return facilities
+    return facilities, complete
 
 
 # --------------------------------------------------------------
 # ② 날짜별 시간 조회
 # --------------------------------------------------------------
-async def fetch_times(session, date_val, rid):
-    url = "https://publicsports.yongin.go.kr/publicsports/sports/selectRegistTimeByChosenDateFcltyRceptResveApply.do"
+async def fetch_times_once(session, date_val, rid, limits=None):
     data = {"dateVal": date_val, "resveId": rid}
+    outcome = "error"
+    started = None
 
     try:
-        async with session.post(url, data=data) as resp:
-            j = await resp.json()
-            return j.get("resveTmList", [])
-    except:
-        return []
+        async with limit_request(limits, TIMES_URL) as slot:
+            started = time.perf_counter()
+            async with session.post(TIMES_URL, data=data, timeout=request_timeout()) as resp:
+                if resp.status >= 400:
+                    outcome = status_outcome(resp.status)
+                    if resp.status in THROTTLE_STATUS:
+                        slot.throttled()
+                    return FetchResult(FAILED, None, f"HTTP {resp.status}")
+                j = await resp.json()
+                times = j.get("resveTmList") or []
+                outcome = OK if times else EMPTY
+                return FetchResult(outcome, times, None)
+    except Exception as e:
+        outcome = error_outcome(e)
+        return FetchResult(FAILED, None, e)
+    finally:
+        record_request("times", outcome, started)
+
+
+async def fetch_times(session, date_val, rid, limits=None):
+    """
+    → FetchResult (실패는 재시도 후에도 FAILED, 빈 날짜는 EMPTY)
+    """
+    for attempt in range(FETCH_RETRIES + 1):
+        result = await fetch_times_once(session, date_val, rid, limits)
+        if result.status != FAILED or isinstance(result.error, BudgetExceeded):
+            return result
+        if attempt < FETCH_RETRIES:
+            await asyncio.sleep(backoff_delay(attempt))
+
+    return result
 
 
 # --------------------------------------------------------------
 # ③ 내일 ~ 다음달 끝까지
 # --------------------------------------------------------------
-async def fetch_availability(session, rid):
-    today = datetime.today()
+def crawl_dates(today=None):
+    today = today or datetime.today()
     start = today + timedelta(days=1)  # ★ 오늘 제외
 
-    result = {}
-
     y, m = start.year, start.month
     last_this = calendar.monthrange(y, m)[1]
 
@@ -150,30 +370,131 @@ async def fetch_availability(session, rid):
     ny, nm = next_dt.year, next_dt.month
     last_next = calendar.monthrange(ny, nm)[1]
 
-    tasks = []
-
     # 이번달
-    for d in range(start.day, last_this + 1):
-        tasks.append(fetch_times(session, f"{y}{m:02d}{d:02d}", rid))
-
+    dates = [f"{y}{m:02d}{d:02d}" for d in range(start.day, last_this + 1)]
     # 다음달
-    for d in range(1, last_next + 1):
-        tasks.append(fetch_times(session, f"{ny}{nm:02d}{d:02d}", rid))
+    dates += [f"{ny}{nm:02d}{d:02d}" for d in range(1, last_next + 1)]
+    return dates
+
+
+def needs_poll(rid, date, day_index, hot_keys, now):
+    key = (rid, date)
+    polled_at = CRAWL_STATE["polled_at"].get(key)
+    if polled_at is None:
+        return True
+
+    # hot: 알람 대상 / 최근 변동
+    if key in hot_keys:
+        return True
+    if now - CRAWL_STATE["changed_at"].get(key, 0) < CHURN_WINDOW:
+        return True
+
+    interval = WARM_INTERVAL if day_index < WARM_DAYS else COLD_INTERVAL
+    return now - polled_at >= interval
+
 
-    times_list = await asyncio.gather(*tasks)
+def record_poll(rid, date, times, now):
+    key = (rid, date)
+    prev = CRAWL_STATE["slots"].get(key)
+    if prev is not None and slot_signature(prev) != slot_signature(times):
+        CRAWL_STATE["changed_at"][key] = now
+    CRAWL_STATE["slots"][key] = times
+    CRAWL_STATE["polled_at"][key] = now
 
-    idx = 0
-    for d in range(start.day, last_this + 1):
-        key = f"{y}{m:02d}{d:02d}"
-        if times_list[idx]:
-            result[key] = times_list[idx]
-        idx += 1
 
-    for d in range(1, last_next + 1):
-        key = f"{ny}{nm:02d}{d:02d}"
-        if times_list[idx]:
-            result[key] = times_list[idx]
-        idx += 1
+def slot_signature(times):
+    return sorted(t.get("timeContent") or "" for t in times)
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def load_crawl_state():
+    """
+    사이클 시작 시 호출 (scheduler 의 lock 안)
+    다른 워커가 마지막 사이클을 돌렸으면 그 조회 상태로 교체
+    """
+    global _crawl_state_stamp
+    stamp = _file_stamp(CRAWL_STATE_PATH)
+    if stamp is None or stamp == _crawl_state_stamp:
+        return
+
+    raw = read_json(CRAWL_STATE_PATH, "crawl state")
+    if raw is None:
+        return
+    for name, table in CRAWL_STATE.items():
+        table.clear()
+        for rid, days in raw.get(name, {}).items():
+            for date, value in days.items():
+                table[(rid, date)] = value
+    _crawl_state_stamp = stamp
+
+
+def save_crawl_state():
+    # {table: {rid: {date: value}}}
+    global _crawl_state_stamp
+    raw = {}
+    for name, table in CRAWL_STATE.items():
+        days = raw[name] = {}
+        for (rid, date), value in table.items():
+            days.setdefault(rid, {})[date] = value
+    try:
+        write_json_atomic(CRAWL_STATE_PATH, raw, ensure_ascii=False, separators=(",", ":"))
+        _crawl_state_stamp = _file_stamp(CRAWL_STATE_PATH)
+    except Exception as e:
+        print("[WARN] crawl state save failed:", e)
+
+
+def prune_crawl_state(dates):
+    # 범위를 벗어난 (지난) 날짜는 정리
+    valid = set(dates)
+    for table in CRAWL_STATE.values():
+        for key in [k for k in table if k[1] not in valid]:
+            del table[key]
+
+
+async def fetch_availability(session, rid, hot_keys=None, incremental=False, stats=None, limits=None, failed=None):
+    """
+    failed: 조회 실패한 (rid, date) 를 모을 set
+    """
+    dates = crawl_dates()
+    now = time.time()
+    hot_keys = hot_keys or set()
+
+    if incremental:
+        targets = [d for i, d in enumerate(dates) if needs_poll(rid, d, i, hot_keys, now)]
+    else:
+        targets = dates
+
+    tasks = [fetch_times(session, d, rid, limits) for d in targets]
+    fetched = await asyncio.gather(*tasks)
+
+    n_failed = 0
+    for d, res in zip(targets, fetched):
+        # 실패한 날짜는 빈 날짜로 취급하지 않고 이전 결과를 유지
+        if res.status == FAILED:
+            n_failed += 1
+            if failed is not None:
+                failed.add((rid, d))
+            continue
+        record_poll(rid, d, res.data, now)
+
+    if stats is not None:
+        stats["polled"] = stats.get("polled", 0) + len(targets)
+        stats["skipped"] = stats.get("skipped", 0) + len(dates) - len(targets)
+        stats["failed"] = stats.get("failed", 0) + n_failed
+
+    # 조회 안 한 날짜는 캐시로 채워서 전체 맵을 만든다
+    result = {}
+    for d in dates:
+        times = CRAWL_STATE["slots"].get((rid, d))
+        if times:
+            result[d] = times
 
     return result
 
@@ -181,21 +502,64 @@ async def fetch_availability(session, rid):
 # --------------------------------------------------------------
 # 전체 실행
 # --------------------------------------------------------------
-async def run_all_async():
+async def run_all_async(hot_keys=None, incremental=None, on_facilities=None, on_availability=None):
+    """
+    hot_keys: 매 사이클 반드시 조회할 {(resveId, date), ...}
+    incremental: None 이면 CRAWL_INCREMENTAL 설정을 따른다
+    on_facilities(facilities, complete): 시설 목록을 받은 직후 호출
+    on_availability(rid, data, failed): 시설 하나의 날짜 조회가 끝날 때마다 호출
+
+    → (facilities, availability, failed, complete)
+      failed: 이번 크롤링에서 조회 실패한 {(resveId, date), ...}
+      complete: 시설 목록을 전부 받았는지 (fetch_facilities)
+    """
+    if incremental is None:
+        incremental = INCREMENTAL
+
     async with aiohttp.ClientSession(
         connector=get_connector(),
         headers=HEADERS
     ) as session:
 
+        # 동시성(AIMD) + 호스트별 속도 + 요청 예산
+        limits = CrawlLimits()
+
         # ★ 1) 세션 시작 → 자동 쿠키 갱신
-        await init_session(session)
+        with CRAWL_PHASE_SECONDS.time(phase="session_init"):
+            await init_session(session, limits)
 
         # ★ 2) 전체 테니스 시설 크롤링
-        facilities = await fetch_facilities(session)
-
-        # ★ 3) 각 시설 날짜 데이터 병렬 처리
-        tasks = [fetch_availability(session, rid) for rid in facilities]
-        results = await asyncio.gather(*tasks)
+        with CRAWL_PHASE_SECONDS.time(phase="facility_list"):
+            facilities, complete = await fetch_facilities(session, limits)
+        if on_facilities:
+            on_facilities(facilities, complete)
+
+        # ★ 3) 각 시설 날짜 데이터 병렬 처리 (끝나는 대로 on_availability)
+        load_crawl_state()
+        prune_crawl_state(crawl_dates())
+        stats = {}
+        failed = set()
+
+        async def crawl_one(rid):
+            rid_failed = set()
+            data = await fetch_availability(session, rid, hot_keys, incremental, stats, limits, rid_failed)
+            failed.update(rid_failed)
+            if on_availability:
+                on_availability(rid, data, rid_failed)
+            return data
+
+        with CRAWL_PHASE_SECONDS.time(phase="availability"):
+            results = await asyncio.gather(*(crawl_one(rid) for rid in facilities))
+        save_crawl_state()
+
+        for result in ("polled", "skipped", "failed"):
+            CRAWL_DATES.inc(stats.get(result, 0), result=result)
+        CRAWL_CONCURRENCY.set(limits.limiter.limit)
+        print(
+            f"[INFO] availability polled={stats.get('polled', 0)} "
+            f"skipped={stats.get('skipped', 0)} failed={stats.get('failed', 0)}"
+        )
+        print(f"[INFO] crawl limits {limits.summary()}")
 
         availability = {
             rid: data
@@ -203,8 +567,75 @@ async def run_all_async():
             if data
         }
 
-        return facilities, availability
+        return facilities, availability, failed, complete
+
+
+def run_all(hot_keys=None, incremental=None):
+    return asyncio.run(run_all_async(hot_keys, incremental))
 
 
-def run_all():
-    return asyncio.run(run_all_async())
+# --------------------------------------------------------------
+# 스트리밍 실행 (시설별 결과를 끝나는 대로 넘김)
+# --------------------------------------------------------------
+FACILITIES = "facilities"
+AVAILABILITY = "availability"
+DONE = "done"
+
+
+def stream_all(hot_keys=None, incremental=None):
+    """
+    크롤링은 별도 스레드의 이벤트 루프에서 돌리고 결과를 순서대로 yield
+      (FACILITIES, (facilities, complete))
+      (AVAILABILITY, (rid, data, failed))  ← 시설마다, 끝난 순서대로
+      (DONE, (facilities, availability, failed, complete))
+    크롤링 중 예외는 그대로 다시 발생시킨다.
+    소비하는 쪽이 중간에 멈추면(예외 / close) 크롤링을 취소하고 스레드가 끝날 때까지 기다린다
+    → 사이클이 끝난 뒤에 upstream 요청이나 CRAWL_STATE 변경이 남지 않는다
+    """
+    events = queue.Queue()
+    lock = threading.Lock()
+    stopped = False
+    cancel = None
+
+    async def crawl():
+        nonlocal cancel
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        with lock:
+            if stopped:
+                raise asyncio.CancelledError()
+            cancel = lambda: loop.call_soon_threadsafe(task.cancel)
+        try:
+            return await run_all_async(
+                hot_keys,
+                incremental,
+                on_facilities=lambda f, complete: events.put((FACILITIES, (f, complete))),
+                on_availability=lambda rid, data, f: events.put((AVAILABILITY, (rid, data, f))),
+            )
+        finally:
+            with lock:
+                cancel = None
+
+    def worker():
+        try:
+            events.put((DONE, asyncio.run(crawl())))
+        except BaseException as e:
+            events.put((None, e))
+
+    thread = threading.Thread(target=worker, name="crawl-stream", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            kind, value = events.get()
+            if kind is None:
+                raise value
+            yield kind, value
+            if kind == DONE:
+                return
+    finally:
+        with lock:
+            stopped = True
+            if cancel:
+                cancel()
+        thread.join()